@@ -0,0 +1,247 @@
+import collections, multiprocessing
+import concurrent.futures
+import trollius
+from trollius import From, Return
+import batch, benchmark, model_bundle, norvig
+
+# Words waiting for a worker at most; once this many are queued, new words
+# wait (asynchronously) for room instead of piling up in memory.
+MAX_PENDING = 1024
+
+# @brief Corrects one word with norvig.correct(); runs in a worker
+def _correct_norvig(word):
+	return norvig.correct(word)
+
+# Scoring functions by corrector name. Each is module level, so a process
+# executor can ship it to its workers. "scramble" is batch.py's worker
+# function: it corrects against batch's models, which corrector() sets before
+# the executor starts its workers, so worker processes inherit them
+# copy-on-write instead of unpickling a copy for every word.
+SCORERS = {"scramble": batch._suggest, "norvig": _correct_norvig}
+
+# @brief An executor for the scoring functions
+#
+# @param kind "thread" or "process". Threads share the interpreter lock with
+# the event loop, so the loop slows while they score; processes keep it
+# responsive.
+# @param workers How many threads or processes; one per core when omitted
+def executor(kind, workers=None):
+	workers = workers or multiprocessing.cpu_count()
+	if kind == "thread":
+		return concurrent.futures.ThreadPoolExecutor(workers)
+	if kind == "process":
+		return concurrent.futures.ProcessPoolExecutor(workers)
+	raise ValueError("unknown executor %r" % kind)
+
+# @brief Corrects words from coroutines without blocking the event loop
+# suggest(), suggest_all() and suggest_each() are coroutines. A word that is
+# already queued or being scored is not scored again: later requests for it
+# wait on the same future. Other words go through a bounded queue, from which
+# one worker coroutine per executor worker hands them to the executor, so the
+# loop itself only ever queues words and delivers results.
+#
+# When the queue is full, suggest() waits for room, which slows producers
+# down to the pace of the executor instead of letting the backlog grow.
+# suggest_each() starts a request for the next word only as one finishes, so
+# a batch of any size holds at most a window of requests at a time.
+#
+# Works with trollius (asyncio for Python 2): write `yield From(...)` where
+# asyncio has `yield from`.
+class AsyncCorrector(object):
+	# @param score Corrects one word; must be picklable for a process executor
+	# @param executor A concurrent.futures executor to run score in
+	# @param workers How many words to score at a time; match the executor
+	# @param max_pending How many words may wait for a worker
+	# @param loop The event loop; the current one when omitted
+	def __init__(self, score, executor, workers, max_pending=MAX_PENDING,
+			loop=None):
+		self._score = score
+		self._executor = executor
+		self._loop = loop or trollius.get_event_loop()
+		self._queue = trollius.Queue(max_pending, loop=self._loop)
+		self._window = max_pending+workers
+		self._inflight = {}
+		self.counts = collections.Counter()
+		self._workers = [trollius.ensure_future(self._work(), loop=self._loop)
+			for i in range(workers)]
+
+	# @brief Corrects one word
+	#
+	# @return What score returns for it
+	@trollius.coroutine
+	def suggest(self, word):
+		self.counts["requests"] += 1
+		future = self._inflight.get(word)
+		if future is None:
+			future = self._inflight[word] = trollius.Future(loop=self._loop)
+			future.add_done_callback(lambda done: self._forget(word, done))
+			try:
+				yield From(self._queue.put((word, future)))
+			except:
+				# Nobody will score it; fail whoever is waiting on it too
+				self._forget(word, future)
+				future.cancel()
+				raise
+		else:
+			self.counts["coalesced"] += 1
+		# Shielded, so one cancelled caller doesn't cancel the others' result
+		result = yield From(trollius.shield(future, loop=self._loop))
+		raise Return(result)
+
+	# @brief Corrects a list of words concurrently
+	#
+	# @return One result per word, in order
+	@trollius.coroutine
+	def suggest_all(self, words):
+		results = []
+		yield From(self.suggest_each(words,
+			lambda word, result: results.append(result)))
+		raise Return(results)
+
+	# @brief Corrects the words of an iterable concurrently, handing each
+	# result to emit(word, result) in input order
+	# Only window words are requested at a time; the next is taken from words
+	# when the oldest is done. If a word fails, the words still in progress
+	# are cancelled and the error raised.
+	#
+	# @param words Any iterable, e.g. the lines of a file
+	# @param window How many words to have in progress; by default enough to
+	# fill the queue and every worker
+	@trollius.coroutine
+	def suggest_each(self, words, emit, window=None):
+		window = window or self._window
+		pending = collections.deque()
+		try:
+			for word in words:
+				if len(pending) >= window:
+					oldest, task = pending.popleft()
+					result = yield From(task)
+					emit(oldest, result)
+				pending.append((word,
+					trollius.ensure_future(self.suggest(word), loop=self._loop)))
+			while pending:
+				oldest, task = pending.popleft()
+				result = yield From(task)
+				emit(oldest, result)
+		except:
+			for word, task in pending:
+				task.cancel()
+			raise
+
+	def _forget(self, word, future):
+		if self._inflight.get(word) is future:
+			del self._inflight[word]
+
+	@trollius.coroutine
+	def _work(self):
+		while True:
+			word, future = yield From(self._queue.get())
+			if future.done():
+				continue
+			try:
+				result = yield From(self._loop.run_in_executor(self._executor,
+					self._score, word))
+			except Exception, e:
+				if not future.done():
+					future.set_exception(e)
+				self.counts["errors"] += 1
+			else:
+				if not future.done():
+					future.set_result(result)
+				self.counts["scored"] += 1
+
+	# @brief Requests, coalesced requests, words scored and failed, and how
+	# many words are queued and in flight right now
+	def stats(self):
+		stats = dict(self.counts)
+		stats["queued"] = self._queue.qsize()
+		stats["inflight"] = len(self._inflight)
+		return stats
+
+	# @brief Stops the worker coroutines and shuts the executor down
+	def close(self):
+		for worker in self._workers:
+			worker.cancel()
+		self._executor.shutdown(wait=True)
+
+# @brief An AsyncCorrector for one of the SCORERS
+#
+# @param name "scramble" or "norvig"
+# @param models The Models scramble corrects against; loaded through the
+# model bundle when omitted
+# @param kind The executor(): "thread" or "process"
+def corrector(name="scramble", models=None, kind="process", workers=None,
+		max_pending=MAX_PENDING, loop=None):
+	if name == "scramble":
+		batch._models = models if models is not None else \
+			model_bundle.load_or_build()
+	else:
+		norvig.NWORDS.get()  # before any worker process forks
+	workers = workers or multiprocessing.cpu_count()
+	return AsyncCorrector(SCORERS[name], executor(kind, workers), workers,
+		max_pending, loop)
+
+# @brief Measures how late the event loop runs a timer while it works
+# Reschedules itself every interval seconds until stopped, and records by how
+# much each wake-up missed its time.
+class LoopLag(object):
+	def __init__(self, loop, interval=0.01):
+		self.lags = []
+		self._loop = loop
+		self._interval = interval
+		self._handle = None
+
+	def start(self):
+		self._due = self._loop.time()+self._interval
+		self._handle = self._loop.call_at(self._due, self._tick)
+
+	def _tick(self):
+		self.lags.append(self._loop.time()-self._due)
+		self.start()
+
+	def stop(self):
+		self._handle.cancel()
+
+	def percentile(self, p):
+		return benchmark.percentile(sorted(self.lags), p)
+
+if __name__ == "__main__":
+	import argparse, sys, time
+	parser = argparse.ArgumentParser(description="Correct a file of "
+		"misspellings from an event loop, reporting how responsive it stayed")
+	parser.add_argument("input", nargs="?", default="-",
+		help="file to read words from, one per line; - for stdin")
+	parser.add_argument("--corrector", default="scramble",
+		choices=sorted(SCORERS))
+	parser.add_argument("--executor", default="process",
+		choices=["thread", "process"])
+	parser.add_argument("--workers", type=int, default=None)
+	parser.add_argument("--max-pending", type=int, default=MAX_PENDING)
+	parser.add_argument("--bundle", default=model_bundle.BUNDLE_PATH)
+	parser.add_argument("--corpus", default=model_bundle.CORPUS)
+	args = parser.parse_args()
+	f = sys.stdin if args.input == "-" else open(args.input, "r")
+	words = (line.strip() for line in f if line.strip())
+	models = None
+	if args.corrector == "scramble":
+		models = model_bundle.load_or_build(args.bundle, args.corpus)
+	loop = trollius.get_event_loop()
+	service = corrector(args.corrector, models, args.executor, args.workers,
+		args.max_pending, loop)
+	counted = collections.Counter()
+	def emit(word, result):
+		if isinstance(result, tuple):
+			result = result[0]
+		sys.stdout.write("%s\t%s\n" % (word, result))
+		counted["words"] += 1
+	lag = LoopLag(loop)
+	lag.start()
+	start = time.time()
+	loop.run_until_complete(service.suggest_each(words, emit))
+	seconds = time.time()-start
+	lag.stop()
+	service.close()
+	sys.stderr.write("%d words in %.2fs; loop lag p50 %.2fms p99 %.2fms "
+		"max %.2fms; %r\n" % (counted["words"], seconds,
+		lag.percentile(50)*1000, lag.percentile(99)*1000,
+		max(lag.lags or [0])*1000, service.stats()))
@@ -0,0 +1,89 @@
+import collections, itertools, multiprocessing
+import model_bundle, scramble_helpers
+
+# Words handed to a worker at a time; large enough to amortize the cost of
+# shipping tasks and results between processes.
+CHUNK_SIZE = 256
+
+# Chunks queued or being scored at most, per worker. Only this many are read
+# from the input ahead of the results, so memory stays bounded however long
+# the input is, while every worker still has its next chunk waiting.
+CHUNKS_PER_WORKER = 2
+
+# The models every worker scores against. They are set in the parent just
+# before the pool forks, so workers inherit them copy-on-write instead of
+# unpickling a copy each. The compact similarity index is a handful of large
+# arrays, so reference counting in the workers touches only a few pages of it.
+_models = None
+
+# @brief Corrects one word against the inherited models; runs in a worker
+def _suggest(word):
+	m = _models
+	return scramble_helpers.suggest(word, m.char_model, m.similarity_model,
+		m.word_model_tuple, m.error_model, prune=True)
+
+# @brief Corrects a chunk of words; runs in a worker
+def _suggest_chunk(words):
+	return [_suggest(word) for word in words]
+
+# @brief Corrects many words across a pool of worker processes
+# Results are streamed back as they complete, but always in input order.
+# The input is read a chunk at a time, and only as results are consumed, so
+# at most chunks_per_worker chunks per worker are ever in flight.
+#
+# @param words An iterable of words to correct
+# @param models The Models to correct against; loaded through the model
+# bundle when omitted
+# @param processes Number of workers; one per core when omitted
+# @param chunk_size Words handed to a worker at a time
+# @param chunks_per_worker Chunks queued or being scored at most, per worker
+#
+# @return Yield a (suggestion, word, probability) tuple per word, in order
+def suggest_all(words, models=None, processes=None, chunk_size=CHUNK_SIZE,
+		chunks_per_worker=CHUNKS_PER_WORKER):
+	global _models
+	_models = models if models is not None else model_bundle.load_or_build()
+	processes = processes or multiprocessing.cpu_count()
+	words = iter(words)
+	pool = multiprocessing.Pool(processes)
+	try:
+		pending = collections.deque()
+		while True:
+			while len(pending) < processes*chunks_per_worker:
+				chunk = list(itertools.islice(words, chunk_size))
+				if not chunk:
+					break
+				pending.append(pool.apply_async(_suggest_chunk, (chunk,)))
+			if not pending:
+				break
+			for result in pending.popleft().get():
+				yield result
+		pool.close()
+	except:
+		pool.terminate()
+		raise
+	finally:
+		pool.join()
+
+# @brief Yields the words of a file with one word per line, skipping blanks
+def read_words(f):
+	for line in f:
+		word = line.strip()
+		if word:
+			yield word
+
+if __name__ == "__main__":
+	import argparse, sys
+	parser = argparse.ArgumentParser(
+		description="Correct a file of misspellings, one word per line")
+	parser.add_argument("input", nargs="?", default="-",
+		help="file to read words from; - for stdin")
+	parser.add_argument("--processes", type=int, default=None)
+	parser.add_argument("--bundle", default=model_bundle.BUNDLE_PATH)
+	parser.add_argument("--corpus", default=model_bundle.CORPUS)
+	args = parser.parse_args()
+	models = model_bundle.load_or_build(args.bundle, args.corpus)
+	f = sys.stdin if args.input == "-" else open(args.input, "r")
+	for suggestion, word, probability in suggest_all(read_words(f), models,
+			args.processes):
+		sys.stdout.write("%s\t%s\n" % (word, suggestion))
@@ -0,0 +1,222 @@
+import math
+import error_model_helpers, scramble_helpers
+
+# NumPy is optional: without it every function here falls back to the
+# per-candidate reference implementation in scramble_helpers.
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# Batched scores within this distance of the best one are re-scored with the
+# reference implementation before a winner is picked. exp(sum of logs) and a
+# running product can disagree in the last few bits, and suggest() breaks
+# ties by exact comparison, so near-ties are settled the way it settles them.
+ABS_TOLERANCE = 1e-12
+REL_TOLERANCE = 1e-9
+
+# @brief Encodes words as fixed-width, 256-column character count vectors
+# Row i of the result holds, in column c, how many times the character with
+# code c occurs in words[i]. The whole batch is counted in one bincount.
+#
+# @param words A list of byte strings
+#
+# @return An array of shape (len(words), 256)
+def char_count_matrix(words):
+	lengths = numpy.array([len(word) for word in words], dtype=numpy.intp)
+	codes = numpy.frombuffer("".join(words), dtype=numpy.uint8)
+	rows = numpy.repeat(numpy.arange(len(words), dtype=numpy.intp), lengths)
+	counts = numpy.bincount(rows*256 + codes, minlength=len(words)*256)
+	return counts.reshape(len(words), 256)
+
+# @brief Log of probability_index(word, candidate) for every candidate at once
+# The overlap of two words is, per character, the smaller of its two counts,
+# so the overlaps of the whole batch are one element-wise minimum against the
+# query's count vector. Only the query's characters can overlap, so only
+# those columns are kept. The log probability of each overlap is then its dot
+# product with the log character probabilities, which cannot underflow the
+# way a product of many small probabilities does.
+#
+# @param word The misspelled word
+# @param candidates A list of possible corrections
+# @param char_model Probabilistic model of characters; get from char_model()
+#
+# @return An array holding one log probability per candidate
+def overlap_log_probabilities(word, candidates, char_model):
+	query = char_count_matrix([word])[0]
+	columns = numpy.flatnonzero(query)
+	# char_model() defaults unseen characters to a probability of 1
+	log_probs = numpy.array(
+		[math.log(char_model.get(chr(c), 1)) for c in columns])
+	overlap = numpy.minimum(char_count_matrix(candidates)[:, columns],
+		query[columns])
+	return overlap.dot(log_probs)
+
+# @brief Log of edit_probability(candidate, word) for every candidate at once
+# Each candidate still needs its own edit summary, but the cells of all the
+# summaries are then gathered from the table and summed per candidate in one
+# weighted bincount.
+#
+# @param word The misspelled word
+# @param candidates A list of possible corrections
+# @param error_table The error_model_helpers.error_table() of the error model
+#
+# @return An array holding one log probability per candidate
+def edit_log_probabilities(word, candidates, error_table):
+	rows = error_model_helpers.EDIT_ROWS
+	cells = []
+	owners = []
+	for i, candidate in enumerate(candidates):
+		for edit in error_model_helpers.minimum_edits(candidate, word):
+			cells.append(rows[edit[0]]*256+ord(edit[1]))
+			owners.append(i)
+	table = numpy.frombuffer(error_table, dtype=float)
+	return numpy.bincount(numpy.array(owners, dtype=numpy.intp),
+		weights=table[numpy.array(cells, dtype=numpy.intp)],
+		minlength=len(candidates))
+
+# @brief Batched equivalent of scramble_helpers.suggest()
+# Scores every candidate from closest_words() at once and returns exactly what
+# suggest() would: the first candidate, in the order suggest() visits them,
+# with the smallest score below 1.
+#
+# @param word The word to correct
+# @param char_model Probability distribution for chars in given language
+# @param similarity_model Helps us find words that are "like" our misspelling
+# @param word_model_tuple Unused; kept for signature parity with suggest()
+# @param error_model Probability distribution for spelling errors
+# @param error_table Optional error_model_helpers.error_table() of
+# error_model; candidates are then scored from its log probabilities, and
+# only near-ties are re-scored against error_model. Build it without
+# smoothing for the result to stay exactly that of suggest().
+#
+# @return A tuple of the suggestion, the original word, and the probability
+def suggest_batched(word,char_model,similarity_model,word_model_tuple,
+		error_model, error_table=None):
+	if numpy is None:
+		return scramble_helpers.suggest(
+			word,char_model,similarity_model,word_model_tuple,error_model)
+	word = word.lower()
+	candidates = [correction.lower() for correction in
+		scramble_helpers.closest_words(word,similarity_model)]
+	if not candidates:
+		return ("", word, 1)
+
+	scores = numpy.exp(overlap_log_probabilities(word, candidates, char_model))
+	if error_table is not None:
+		scores -= numpy.exp(edit_log_probabilities(word, candidates, error_table))
+	else:
+		scores -= numpy.array([scramble_helpers.edit_probability(correction,
+			word, error_model) for correction in candidates], dtype=float)
+	return _best_of(word, candidates, scores, char_model, error_model)
+
+# @brief Picks what suggest() would from batched scores of its candidates
+# Candidates whose score is within tolerance of the best one are re-scored
+# one by one, in order, exactly as suggest() scores them.
+def _best_of(word, candidates, scores, char_model, error_model):
+	best = scores.min()
+	near = numpy.flatnonzero(
+		scores <= best + ABS_TOLERANCE + REL_TOLERANCE*abs(best))
+	current_best = ("",1)
+	for i in near:
+		probability = scramble_helpers.probability_index(
+			word,candidates[i],char_model) - scramble_helpers.edit_probability(
+			candidates[i], word, error_model)
+		if current_best[1] > probability:
+			current_best = (candidates[i],probability)
+	return (current_best[0], word, current_best[1])
+
+# @brief edit_probability() of some (word, candidate) pairs, in one bincount
+#
+# @param owners Which of words each candidate belongs to
+# @param which Positions in candidates of the pairs to score
+# @param table error_model_helpers.scored_table(), as a numpy array
+def _edit_probabilities(words, candidates, owners, which, table):
+	rows = error_model_helpers.EDIT_ROWS
+	cells = []
+	pairs = []
+	for n, j in enumerate(which):
+		for edit in error_model_helpers.minimum_edits(candidates[j],
+				words[owners[j]]):
+			cells.append(rows[edit[0]]*256+ord(edit[1]))
+			pairs.append(n)
+	return numpy.exp(numpy.bincount(numpy.array(pairs, dtype=numpy.intp),
+		weights=table[numpy.array(cells, dtype=numpy.intp)],
+		minlength=len(which)))
+
+# @brief suggest_batched() for many words at once
+# The candidates of all the words are scored as one batch: their character
+# counts in one bincount, their overlaps with their own query in one
+# element-wise minimum, and the log probabilities of those overlaps, and of
+# the edit summaries, in one pass each. Only the edit summaries themselves
+# are still computed candidate by candidate, and only for candidates that
+# can win: as in suggest(prune=True), a candidate whose score is bounded
+# below (see scramble_helpers.edit_probability_bound()) by more than the
+# score of the most promising candidate of the same word is never aligned.
+# Each word then gets exactly what suggest_batched() returns for it.
+#
+# @param words A list of words to correct
+#
+# @return One (suggestion, word, probability) tuple per word, in order
+def suggest_many(words,char_model,similarity_model,word_model_tuple,
+		error_model):
+	if numpy is None:
+		return [scramble_helpers.suggest(word,char_model,similarity_model,
+			word_model_tuple,error_model,prune=True) for word in words]
+	words = [word.lower() for word in words]
+	candidates = []
+	bounds = [0]
+	for word in words:
+		candidates.extend(correction.lower() for correction in
+			scramble_helpers.closest_words(word,similarity_model))
+		bounds.append(len(candidates))
+	results = [("", word, 1) for word in words]
+	if not candidates:
+		return results
+	owners = numpy.repeat(numpy.arange(len(words), dtype=numpy.intp),
+		numpy.diff(bounds))
+
+	# char_model() defaults unseen characters to a probability of 1
+	log_chars = numpy.array(
+		[math.log(char_model.get(chr(c), 1)) for c in range(256)])
+	overlap = numpy.minimum(char_count_matrix(candidates),
+		char_count_matrix(words)[owners])
+	scores = numpy.exp(overlap.dot(log_chars))
+
+	# Fewest edits any alignment needs, as in edit_probability_bound(); pairs
+	# with non-letters get no bound
+	raw_table = error_model_helpers.scored_table(error_model)
+	table = numpy.frombuffer(raw_table, dtype=float)
+	lengths = numpy.array([len(candidate) for candidate in candidates])
+	missing = numpy.maximum(lengths, numpy.array(
+		[len(word) for word in words])[owners]) - overlap.sum(axis=1)
+	non_letter = scramble_helpers.NON_LETTER.search
+	letters = numpy.array([not non_letter(word) for word in words])[owners] & \
+		numpy.array([not non_letter(candidate) for candidate in candidates])
+	max_log = scramble_helpers.max_log_probability(raw_table)
+	lower = scores - numpy.where(letters & (missing > 0),
+		numpy.exp(numpy.maximum(missing, 1)*max_log), 1.0)
+
+	# Align the most promising candidate of each word first; its score bounds
+	# the word's best from above, and every candidate bounded below above it
+	# is skipped
+	first = [lo+int(numpy.argmin(lower[lo:hi])) for lo, hi in
+		zip(bounds, bounds[1:]) if lo < hi]
+	scores[first] -= _edit_probabilities(words, candidates, owners, first,
+		table)
+	upper = numpy.zeros(len(words))
+	upper[owners[first]] = scores[first]
+	upper = upper[owners]
+	live = lower <= upper + ABS_TOLERANCE + REL_TOLERANCE*abs(upper)
+	live[first] = False
+	rest = numpy.flatnonzero(live)
+	scores[rest] -= _edit_probabilities(words, candidates, owners, rest, table)
+	live[first] = True
+	scores[~live] = numpy.inf
+
+	for i, word in enumerate(words):
+		lo, hi = bounds[i], bounds[i+1]
+		if lo < hi:
+			results[i] = _best_of(word, candidates[lo:hi], scores[lo:hi],
+				char_model, error_model)
+	return results
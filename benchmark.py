@@ -0,0 +1,317 @@
+import collections, gc, json, os, random, sys, tempfile, time
+import error_model_helpers, ingest, model_bundle, norvig, scramble_helpers, \
+	spell, test_sets
+
+# Birkbeck test files, relative to the working directory like the corpus
+BIRKBECK = [("birkbeck_easy", "test_errors_easy"),
+	("birkbeck_veryhard", "test_errors_veryhard")]
+
+# Synthetic misspellings generated per edit distance by default
+SYNTHETIC_COUNT = 200
+
+CORRECTORS = ["scramble", "spell", "norvig"]
+
+# A named list of (misspelling, correction) pairs
+Workload = collections.namedtuple("Workload", ["name", "pairs"])
+
+# A corrector under test: correct() maps a word to its suggestion, and the
+# rest describes what it cost to build
+Corrector = collections.namedtuple("Corrector",
+	["name", "correct", "build_seconds", "rss_growth_kb"])
+
+# @brief Measures what closest_words() allocates and leaves behind per query
+# Python 2 has no allocation tracer, so this measures what can be observed:
+# how many garbage-collected containers each query leaves alive (its result
+# should be the only one), how many bytes that result occupies, and how many
+# entries the similarity model itself gains over the run (a read-only query
+# path gains none).
+#
+# @param similarity_model A similarity_model() or SimilarityIndex
+# @param words The queries to run
+#
+# @return A dict of per-query averages and the model's growth
+def closest_words_allocations(similarity_model, words):
+	size = lambda: len(similarity_model) if hasattr(similarity_model,
+		"__len__") else 0
+	model_before = size()
+	results = []
+	gc.collect()
+	gc.disable()
+	try:
+		objects_before = len(gc.get_objects())
+		for word in words:
+			results.append(scramble_helpers.closest_words(word, similarity_model))
+		objects_after = len(gc.get_objects())
+	finally:
+		gc.enable()
+	queries = float(len(words) or 1)
+	return {
+		"queries": len(words),
+		# The results list itself is one of the new objects
+		"containers_per_query": (objects_after-objects_before-1)/queries,
+		"result_bytes_per_query":
+			sum(sys.getsizeof(result) for result in results)/queries,
+		"model_growth": size()-model_before,
+	}
+
+# @brief What spell.suggest() did before Speller: rebuild the histogram of
+# the corpus for every query, then check concatenated lists of every edit
+def _spell_suggest_rereading(word, corpus):
+	f = open(corpus, "r")
+	histogram = spell.build_counter(spell.file_to_list(f))
+	f.close()
+	if spell.check_word(word, histogram):
+		return word
+	partitions = spell.word_part(word)
+	two_words = spell.is_two_words(partitions, histogram)
+	if two_words != "":
+		return two_words
+	corrections = set(spell.add_list(partitions)+spell.del_list(partitions)+
+		spell.sub_list(partitions))
+	return spell.max_c(spell.check_list(corrections, histogram), histogram)
+
+# @brief Per-query latency of spell.suggest() before and after Speller
+#
+# @param words The queries to run
+# @param corpus The corpus file the histogram is built from
+#
+# @return A dict of mean milliseconds per query for each path, the one-off
+# cost of building the Speller, and how many answers differ (only ties
+# between equally frequent corrections can be broken differently)
+def speller_latency(words, corpus="corpus"):
+	start = time.time()
+	before = [_spell_suggest_rereading(word, corpus) for word in words]
+	before_seconds = time.time()-start
+	start = time.time()
+	speller = spell.Speller.from_file(corpus)
+	build_seconds = time.time()-start
+	start = time.time()
+	after = [speller.suggest(word) for word in words]
+	after_seconds = time.time()-start
+	queries = float(len(words) or 1)
+	return {
+		"queries": len(words),
+		"before_ms_per_query": before_seconds*1000/queries,
+		"after_ms_per_query": after_seconds*1000/queries,
+		"build_ms": build_seconds*1000,
+		"differences": sum(1 for b, a in zip(before, after) if b != a),
+	}
+
+# @brief The distinct words of a corpus, most frequent first
+#
+# @param size Keep only this many words, or all of them when None
+def lexicon(corpus=model_bundle.CORPUS, size=None):
+	f = open(corpus, "r")
+	counts = spell.build_counter(ingest.iter_lines(f))
+	f.close()
+	words = sorted((word for word in counts if word.isalpha()),
+		key=lambda word: (-counts[word], word))
+	return words[:size] if size is not None else words
+
+# @brief Misspellings exactly distance Levenshtein edits from lexicon words
+# Each is made by random deletions, insertions and substitutions of lower
+# case letters, and kept only if it is not itself a word of the lexicon and
+# its distance to the word it came from is exactly distance.
+#
+# @param words The lexicon to draw correct words from
+# @param distance How many edits each misspelling is from its word
+# @param count How many misspellings to make
+# @param seed Seed for the random generator, so runs are reproducible
+#
+# @return A list of (misspelling, correction) pairs
+def synthetic_misspellings(words, distance, count=SYNTHETIC_COUNT, seed=0):
+	rng = random.Random("%d:%d" % (seed, distance))
+	letters = "abcdefghijklmnopqrstuvwxyz"
+	known = set(words)
+	candidates = [word for word in words if len(word) > distance]
+	found = []
+	attempts = 0
+	while candidates and len(found) < count and attempts < count*100:
+		attempts += 1
+		word = rng.choice(candidates)
+		misspelling = word
+		for i in range(distance):
+			op = rng.choice("DIR")
+			at = rng.randrange(len(misspelling)+(op == "I"))
+			if op == "D":
+				misspelling = misspelling[:at] + misspelling[at+1:]
+			elif op == "I":
+				misspelling = misspelling[:at] + rng.choice(letters) + \
+					misspelling[at:]
+			else:
+				misspelling = misspelling[:at] + rng.choice(letters) + \
+					misspelling[at+1:]
+		if misspelling in known or \
+				error_model_helpers.edit_distance(word, misspelling) != distance:
+			continue
+		found.append((misspelling, word))
+	return found
+
+# @brief The standard workloads: both test sets, the Birkbeck test files that
+# exist, and synthetic misspellings at each distance
+#
+# @param words The lexicon synthetic misspellings are drawn from
+def workloads(words, distances=(1, 2), synthetic_count=SYNTHETIC_COUNT,
+		seed=0):
+	found = [Workload("tests1", test_sets.pairs(test_sets.tests1)),
+		Workload("tests2", test_sets.pairs(test_sets.tests2))]
+	for name, path in BIRKBECK:
+		if os.path.exists(path):
+			found.append(Workload(name, test_sets.birkbeck_pairs(path)))
+	for distance in distances:
+		found.append(Workload("synthetic_d%d" % distance,
+			synthetic_misspellings(words, distance, synthetic_count, seed)))
+	return found
+
+# @brief Writes the lines of corpus whose word is in words to a temporary
+# file, so models can be built over a smaller lexicon
+def _restricted_corpus(corpus, words):
+	words = set(words)
+	fd, path = tempfile.mkstemp(prefix="lexicon")
+	out = os.fdopen(fd, "w")
+	f = open(corpus, "r")
+	for line in ingest.iter_lines(f):
+		if line.strip() in words:
+			out.write(line + "\n")
+	f.close()
+	out.close()
+	return path
+
+def _timed_build(build):
+	rss = ingest.peak_rss_kb()
+	start = time.time()
+	built = build()
+	return built, time.time()-start, ingest.peak_rss_kb()-rss
+
+# @brief Builds the correctors to compare, timing each build
+# The scramble corrector and spell.Speller are built from corpus, restricted
+# to the lexicon_size most frequent words when given. norvig always uses its
+# model of big.txt, so its build is loading that model.
+# Memory is the growth of the peak resident set size, so a corrector built
+# after a larger one can show none.
+#
+# @param names Which of CORRECTORS to build
+#
+# @return A list of Correctors
+def build_correctors(names=CORRECTORS, corpus=model_bundle.CORPUS,
+		lexicon_size=None):
+	source = corpus
+	if lexicon_size is not None:
+		source = _restricted_corpus(corpus, lexicon(corpus, lexicon_size))
+	correctors = []
+	try:
+		for name in names:
+			if name == "scramble":
+				m, seconds, rss = _timed_build(
+					lambda: model_bundle.build_models(source))
+				correct = lambda word, m=m: scramble_helpers.suggest(word,
+					m.char_model, m.similarity_model, m.word_model_tuple,
+					m.error_model, prune=True)[0]
+			elif name == "spell":
+				speller, seconds, rss = _timed_build(
+					lambda: spell.Speller.from_file(source))
+				correct = speller.suggest
+			elif name == "norvig":
+				seconds, rss = _timed_build(norvig.NWORDS.get)[1:]
+				correct = lambda word: norvig.correct(word.lower())
+			else:
+				raise ValueError("unknown corrector " + name)
+			correctors.append(Corrector(name, correct, seconds, rss))
+	finally:
+		if source != corpus:
+			os.remove(source)
+	return correctors
+
+# @brief The p-th percentile of a sorted list
+def percentile(values, p):
+	if not values:
+		return 0.0
+	return values[min(len(values)-1, int(p/100.0*len(values)))]
+
+# @brief Runs one corrector over one workload
+#
+# @return A dict of accuracy, latency percentiles and throughput
+def run_workload(correct, pairs):
+	latencies = []
+	right = 0
+	start = time.time()
+	for misspelling, target in pairs:
+		query = time.time()
+		suggestion = correct(misspelling)
+		latencies.append(time.time()-query)
+		if suggestion.lower() == target.lower():
+			right += 1
+	seconds = time.time()-start
+	latencies.sort()
+	return {
+		"queries": len(pairs),
+		"accuracy": right/float(len(pairs)) if pairs else 0.0,
+		"p50_ms": percentile(latencies, 50)*1000,
+		"p95_ms": percentile(latencies, 95)*1000,
+		"p99_ms": percentile(latencies, 99)*1000,
+		"queries_per_second": len(pairs)/seconds if seconds else 0.0,
+	}
+
+# @brief Runs every corrector over every workload
+#
+# @return A dict that json.dump() can write, so runs can be compared
+def run(correctors, loads, config=None):
+	results = {
+		"time": time.time(),
+		"config": config or {},
+		"workloads": dict((load.name, len(load.pairs)) for load in loads),
+		"correctors": {},
+	}
+	for corrector in correctors:
+		results["correctors"][corrector.name] = {
+			"build_seconds": corrector.build_seconds,
+			"rss_growth_kb": corrector.rss_growth_kb,
+			"workloads": dict((load.name, run_workload(corrector.correct,
+				load.pairs)) for load in loads),
+		}
+	results["peak_rss_kb"] = ingest.peak_rss_kb()
+	return results
+
+# @brief Formats the results of run() as a table
+def format_results(results):
+	lines = []
+	for name, corrector in sorted(results["correctors"].items()):
+		lines.append("%s: built in %.2fs, +%d KB" % (name,
+			corrector["build_seconds"], corrector["rss_growth_kb"]))
+		for load, r in sorted(corrector["workloads"].items()):
+			lines.append("  %-18s %5d queries  %6.1f%% correct  "
+				"p50 %7.2fms  p95 %7.2fms  p99 %7.2fms  %8.1f q/s" % (load,
+				r["queries"], r["accuracy"]*100, r["p50_ms"], r["p95_ms"],
+				r["p99_ms"], r["queries_per_second"]))
+	return "\n".join(lines)
+
+if __name__ == "__main__":
+	import argparse
+	parser = argparse.ArgumentParser(
+		description="Compare the correctors' accuracy and speed")
+	parser.add_argument("--corpus", default=model_bundle.CORPUS)
+	parser.add_argument("--lexicon-size", type=int, default=None,
+		help="build models over only this many of the most frequent words")
+	parser.add_argument("--correctors", nargs="+", default=CORRECTORS,
+		choices=CORRECTORS)
+	parser.add_argument("--distances", type=int, nargs="*", default=[1, 2],
+		help="edit distances of the synthetic misspellings")
+	parser.add_argument("--synthetic-count", type=int, default=SYNTHETIC_COUNT)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--json", default=None,
+		help="file to write the results to as JSON; - for stdout")
+	args = parser.parse_args()
+	correctors = build_correctors(args.correctors, args.corpus,
+		args.lexicon_size)
+	loads = workloads(lexicon(args.corpus, args.lexicon_size), args.distances,
+		args.synthetic_count, args.seed)
+	results = run(correctors, loads, vars(args))
+	if args.json == "-":
+		json.dump(results, sys.stdout, indent=2, sort_keys=True)
+		print
+	else:
+		print format_results(results)
+		if args.json is not None:
+			f = open(args.json, "w")
+			json.dump(results, f, indent=2, sort_keys=True)
+			f.close()
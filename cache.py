@@ -0,0 +1,212 @@
+import collections, threading
+
+# Default number of entries a cache holds before it starts evicting
+MAX_SIZE = 100000
+
+_MISSING = object()
+
+# @brief Hit, miss and eviction counters shared by the cache classes
+class CacheStats(object):
+	def __init__(self):
+		self.hits = self.misses = self.evictions = 0
+
+	def snapshot(self, size):
+		lookups = self.hits+self.misses
+		return {
+			"hits": self.hits,
+			"misses": self.misses,
+			"evictions": self.evictions,
+			"size": size,
+			"hit_rate": self.hits/float(lookups) if lookups else 0.0,
+		}
+
+# @brief Bounded least-recently-used cache, safe to share across threads
+class LRUCache(object):
+	def __init__(self, max_size=MAX_SIZE):
+		self.max_size = max_size
+		self._entries = collections.OrderedDict()
+		self._lock = threading.Lock()
+		self._stats = CacheStats()
+
+	# @brief The value cached for key, or default; counts a hit or a miss
+	def get(self, key, default=None):
+		with self._lock:
+			value = self._entries.pop(key, _MISSING)
+			if value is _MISSING:
+				self._stats.misses += 1
+				return default
+			self._entries[key] = value  # now the most recently used
+			self._stats.hits += 1
+			return value
+
+	# @brief Caches value under key, evicting the least recently used entry
+	# if the cache is full
+	def put(self, key, value):
+		if self.max_size <= 0:
+			return
+		with self._lock:
+			self._entries.pop(key, None)
+			self._entries[key] = value
+			if len(self._entries) > self.max_size:
+				self._entries.popitem(last=False)
+				self._stats.evictions += 1
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+
+	def __len__(self):
+		return len(self._entries)
+
+	def stats(self):
+		with self._lock:
+			return self._stats.snapshot(len(self._entries))
+
+# @brief Bounded least-frequently-used cache, safe to share across threads
+# Evicts the entry that has been looked up the fewest times, and among those
+# the least recently used one. Every operation is O(1): entries are kept in
+# one insertion-ordered bucket per use count, and the smallest non-empty
+# count is tracked as entries move between buckets.
+class LFUCache(object):
+	def __init__(self, max_size=MAX_SIZE):
+		self.max_size = max_size
+		self._entries = {}  # key -> [value, uses]
+		self._buckets = collections.defaultdict(collections.OrderedDict)
+		self._min_uses = 0
+		self._lock = threading.Lock()
+		self._stats = CacheStats()
+
+	def _touch(self, key, entry):
+		bucket = self._buckets[entry[1]]
+		del bucket[key]
+		if not bucket:
+			del self._buckets[entry[1]]
+			if self._min_uses == entry[1]:
+				self._min_uses += 1
+		entry[1] += 1
+		self._buckets[entry[1]][key] = None
+
+	# @brief The value cached for key, or default; counts a hit or a miss
+	def get(self, key, default=None):
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				self._stats.misses += 1
+				return default
+			self._touch(key, entry)
+			self._stats.hits += 1
+			return entry[0]
+
+	# @brief Caches value under key, evicting the least frequently used entry
+	# if the cache is full
+	def put(self, key, value):
+		if self.max_size <= 0:
+			return
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None:
+				entry[0] = value
+				self._touch(key, entry)
+				return
+			if len(self._entries) >= self.max_size:
+				bucket = self._buckets[self._min_uses]
+				evicted, unused = bucket.popitem(last=False)
+				if not bucket:
+					del self._buckets[self._min_uses]
+				del self._entries[evicted]
+				self._stats.evictions += 1
+			self._entries[key] = [value, 1]
+			self._buckets[1][key] = None
+			self._min_uses = 1
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+			self._buckets.clear()
+			self._min_uses = 0
+
+	def __len__(self):
+		return len(self._entries)
+
+	def stats(self):
+		with self._lock:
+			return self._stats.snapshot(len(self._entries))
+
+# @brief Caches by policy name, for command line options
+POLICIES = {"lru": LRUCache, "lfu": LFUCache}
+
+# @brief How words are normalized before they are looked up
+def normalize_word(word):
+	return word.strip().lower()
+
+# @brief Memoizes a corrector in a bounded cache
+# Wraps any one-argument corrector, e.g. norvig.correct or a closure over
+# scramble_helpers.suggest. Entries are keyed on the normalized word and the
+# model version, so after reload() no entry computed from the old models is
+# ever returned; the stale entries simply age out of the cache.
+#
+# The corrector runs outside the cache's lock, so concurrent misses on
+# different words don't wait for each other. many() looks up a list of words
+# and corrects all of its misses in one call to correct_many.
+class CachedCorrector(object):
+	# @param correct The corrector; called with the normalized word
+	# @param cache An LRUCache or LFUCache
+	# @param version Identifies the models correct uses, e.g. a bundle's
+	# fingerprint
+	# @param normalize How to normalize a word before lookup
+	# @param on_hit Optional; called with the normalized word on every hit
+	# @param correct_many Optional; corrects a list of normalized words, one
+	# result per word. many() calls correct for each miss without it.
+	def __init__(self, correct, cache, version=None, normalize=normalize_word,
+			on_hit=None, correct_many=None):
+		# One attribute, so that reload() swaps them atomically
+		self._current = (correct, version, correct_many)
+		self.cache = cache
+		self.normalize = normalize
+		self.on_hit = on_hit
+
+	def __call__(self, word):
+		correct, version, correct_many = self._current
+		key = (version, self.normalize(word))
+		value = self.cache.get(key, _MISSING)
+		if value is _MISSING:
+			value = correct(key[1])
+			self.cache.put(key, value)
+		elif self.on_hit is not None:
+			self.on_hit(key[1])
+		return value
+
+	# @brief Corrects a list of words, scoring only the misses, together
+	#
+	# @return One result per word, in order
+	def many(self, words):
+		correct, version, correct_many = self._current
+		if correct_many is None:
+			correct_many = lambda words: [correct(word) for word in words]
+		keys = [(version, self.normalize(word)) for word in words]
+		values = [self.cache.get(key, _MISSING) for key in keys]
+		misses = list(collections.OrderedDict.fromkeys(
+			key for key, value in zip(keys, values) if value is _MISSING))
+		scored = {}
+		if misses:
+			scored = dict(zip(misses,
+				correct_many([key[1] for key in misses])))
+			for key in misses:
+				self.cache.put(key, scored[key])
+		for i, (key, value) in enumerate(zip(keys, values)):
+			if value is _MISSING:
+				values[i] = scored[key]
+			elif self.on_hit is not None:
+				self.on_hit(key[1])
+		return values
+
+	# @brief Switches to a new corrector and model version
+	def reload(self, correct, version, correct_many=None):
+		self._current = (correct, version, correct_many)
+
+	@property
+	def version(self):
+		return self._current[1]
+
+	def stats(self):
+		return self.cache.stats()
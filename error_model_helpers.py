@@ -1,14 +1,158 @@
-import operator, itertools, re, collections
+import operator, itertools, re, collections, array, math, os, time, hashlib, \
+	marshal, multiprocessing
 
 TPATH = "0643/0643/"
 TRAIN = ["ABODAT.643", "APPLING1DAT.643", "APPLING2DAT.643"]
 
+# Where train_error_model() can keep the error counts of each training file,
+# keyed by a hash of its contents. Bump COUNTS_VERSION whenever the way
+# errors are counted changes, which discards every cached count.
+COUNTS_CACHE = TPATH + "error_counts.cache"
+COUNTS_VERSION = 1
+
+TrainStats = collections.namedtuple("TrainStats",
+	["files", "trained", "cached", "pairs", "seconds", "pairs_per_second"])
+
+# Row of error_table() holding each kind of edit; a row has one cell per
+# character code
+EDIT_ROWS = {"D": 0, "I": 1, "R": 2}
+
+# Probability added to every letter edit by error_table() (before the table
+# is renormalized), so an edit never seen in training is unlikely rather
+# than impossible
+SMOOTHING = 1e-6
+
 # @brief Returns summary of errors for the minimum edit distance of two words
 # Computes the Levenshtein distance of two words, returning not the count,
 # but a list of the errors themselves. So if there is one replacement, one
 # insertion, and one deletion, we return ["R", "I", "D"]. Calling len() on
 # this list will give us the minimum edit distance.
 #
+# Only the distances are stored while filling the Levenshtein array; the
+# summary is recovered afterwards by walking back once from the last cell,
+# making at every cell the same choice minimum_edits_reference() makes when it
+# builds that cell's summary. The two always return the same list.
+#
+# Like minimum_edits_reference(), which the error model is trained with, the
+# corner of the array starts at -1 rather than 0. The summary is therefore
+# always a valid list of edits, but can be one edit longer than the true
+# Levenshtein distance (see edit_distance()).
+#
+# With a cutoff, the search gives up as soon as every cell of a row is
+# already further than cutoff edits away, since the summary can only grow
+# from there.
+#
+# @param s First string in comparison
+# @param t Second string in comparison
+# @param cutoff Largest edit distance of interest, or None for no limit
+#
+# @return The a list summarizing errors between s and t, or None if they are
+# more than cutoff edits apart
+def minimum_edits(s, t, cutoff=None):
+	m = len(s)
+	n = len(t)
+	if cutoff is not None and abs(m-n) > cutoff:
+		return None
+	# d[i][j] is the edit distance between s[:i] and t[:j]
+	d = [[-1]+range(1, n+1)]
+	for i in range(1, m+1):
+		above = d[i-1]
+		row = [i]
+		left = i
+		c = s[i-1]
+		for j in range(1, n+1):
+			if c == t[j-1]:
+				left = above[j-1]
+			else:
+				left = min(above[j], left, above[j-1])+1
+			row.append(left)
+		if cutoff is not None and min(row) > cutoff:
+			return None
+		d.append(row)
+	# Walk back from d[m][n], preferring deletion, then insertion, then
+	# substitution on ties, exactly as minimum_edits_reference() does.
+	summary = []
+	i, j = m, n
+	while i > 0 and j > 0:
+		if s[i-1] == t[j-1]:
+			i, j = i-1, j-1
+			continue
+		deletion, insertion, substitution = d[i-1][j], d[i][j-1], d[i-1][j-1]
+		if deletion <= insertion and deletion <= substitution:
+			summary.append("D"+s[i-1])
+			i -= 1
+		elif insertion <= substitution:
+			summary.append("I"+t[j-1])
+			j -= 1
+		else:
+			summary.append("R"+s[i-1])
+			i, j = i-1, j-1
+	# The edges of the array are labelled as insertions of whichever string
+	# is left over (see minimum_edits_reference()).
+	while i > 0:
+		summary.append("I"+s[i-1])
+		i -= 1
+	while j > 0:
+		summary.append("I"+t[j-1])
+		j -= 1
+	if cutoff is not None and len(summary) > cutoff:
+		return None
+	summary.reverse()
+	return summary
+
+# @brief Minimum edit distance between two words, without the summary
+# When only the count is needed, this uses the bit-parallel algorithm of
+# Myers (as formulated by Hyyro), which handles a whole column of the
+# Levenshtein array per character of t using Python's arbitrary-size ints
+# as bit vectors.
+#
+# @param s First string in comparison
+# @param t Second string in comparison
+# @param cutoff Largest edit distance of interest, or None for no limit
+#
+# @return The Levenshtein distance between s and t, or None if it exceeds
+# cutoff
+def edit_distance(s, t, cutoff=None):
+	m = len(s)
+	n = len(t)
+	if cutoff is not None and abs(m-n) > cutoff:
+		return None
+	if m == 0:
+		return n
+	# peq[c] has bit i set wherever s[i] == c
+	peq = {}
+	for i in range(m):
+		peq[s[i]] = peq.get(s[i], 0) | (1 << i)
+	full = (1 << m)-1
+	last = 1 << (m-1)
+	pv, mv = full, 0  # positive and negative vertical deltas
+	score = m
+	for j in range(n):
+		eq = peq.get(t[j], 0)
+		xv = eq | mv
+		xh = (((eq & pv)+pv) ^ pv) | eq
+		ph = mv | ~(xh | pv)
+		mh = pv & xh
+		if ph & last:
+			score += 1
+		elif mh & last:
+			score -= 1
+		# The distance can drop by at most one per remaining column
+		if cutoff is not None and score-(n-j-1) > cutoff:
+			return None
+		ph = (ph << 1) | 1
+		mh = mh << 1
+		pv = (mh | ~(xv | ph)) & full
+		mv = ph & xv & full
+	if cutoff is not None and score > cutoff:
+		return None
+	return score
+
+# @brief Original list-copying implementation of minimum_edits()
+# Kept as the reference the faster minimum_edits() is checked against. It
+# keeps a summary list in every cell of the Levenshtein array and copies it
+# into each neighbouring cell.
+#
 # This method is confusing, but the algorithm is taken almost directly from
 # wikipedia, so if you're confused, go there.
 #
@@ -16,7 +160,7 @@ TRAIN = ["ABODAT.643", "APPLING1DAT.643", "APPLING2DAT.643"]
 # @param t Second string in comparison
 #
 # @return The a list summarizing errors between s and t
-def minimum_edits(s, t):
+def minimum_edits_reference(s, t):
 	m = len(s)+1  # these two variables are for convenience purposes
 	n = len(t)+1
 	# Build list to hold the Levenshtein array; we solve the problem of
@@ -64,9 +208,10 @@ def minimum_edits(s, t):
 					summary[i][j] = summary[i-1][j-1] + ["R"+s[i-1]]
 	return summary[m-1][n-1]
 
-# @brief Find misspellings trains the error model on them
-def train_abodat(path, model):
-	f = open(path, "r")
+# @brief Yields the (misspelling, correction) pairs of the ABODAT file
+# NOTE: the second test compares against 0 rather than None, so it is always
+# true and no pair is ever yielded; training on this file is a no-op.
+def abodat_pairs(f):
 	for line in f:
 		if line[0] == "$":
 			continue
@@ -76,27 +221,20 @@ def train_abodat(path, model):
 			words = pair.split()
 			if re.search("[^a-zA-Z]+", words[0]) != None or re.search("[^a-zA-Z]+", words[1]) != 0:
 				continue
-			for error in minimum_edits(words[0], words[1]):
-				print error
-				model[error] += 1
-	return model
+			yield words[0], words[1]
 
-# @brief Find misspellings trains the error model on them
-def train_appling1dat(path, model):
-	f = open(path, "r")
+# @brief Yields the (misspelling, correction) pairs of the APPLING1DAT file
+def appling1dat_pairs(f):
 	for line in f:
 		if line[0] == "$":
 			continue
 		words = line.split()
 		if re.search("[^a-zA-Z]+", words[0]) != None or re.search("[^a-zA-Z]+", words[1]) != None:
 			continue
-		for error in minimum_edits(words[0], words[1]):
-			model[error] += 1
-	return model
+		yield words[0], words[1]
 
-# @brief Find misspellings trains the error model on them
-def train_appling2dat(path, model):
-	f = open(path, "r")
+# @brief Yields the (misspelling, correction) pairs of the APPLING2DAT file
+def appling2dat_pairs(f):
 	for line in f:
 		if line[0] == "$":
 			continue
@@ -105,8 +243,40 @@ def train_appling2dat(path, model):
 			continue
 		if re.search("[^a-zA-Z]+", words[0]) != None or re.search("[^a-zA-Z]+", words[1]) != None:
 			continue
-		for error in minimum_edits(words[0], words[1]):
+		yield words[0], words[1]
+
+# How each training file is parsed, by file name; any other file is read as
+# "misspelling correction" lines, like APPLING2DAT
+PARSERS = {
+	TRAIN[0]: abodat_pairs,
+	TRAIN[1]: appling1dat_pairs,
+	TRAIN[2]: appling2dat_pairs,
+}
+
+# @brief Adds the errors of each (misspelling, correction) pair to model
+#
+# @return How many pairs were counted
+def count_pairs(pairs, model):
+	count = 0
+	for misspelling, correction in pairs:
+		for error in minimum_edits(misspelling, correction):
 			model[error] += 1
+		count += 1
+	return count
+
+# @brief Find misspellings trains the error model on them
+def train_abodat(path, model):
+	count_pairs(abodat_pairs(open(path, "r")), model)
+	return model
+
+# @brief Find misspellings trains the error model on them
+def train_appling1dat(path, model):
+	count_pairs(appling1dat_pairs(open(path, "r")), model)
+	return model
+
+# @brief Find misspellings trains the error model on them
+def train_appling2dat(path, model):
+	count_pairs(appling2dat_pairs(open(path, "r")), model)
 	return model
 
 # @brief Finds the probability that correction is misspelled as malformed
@@ -121,29 +291,226 @@ def train_appling2dat(path, model):
 def error_probability(malformed, correction, error_model):
 	return reduce(operator.mul,
 	[error_model[error] for error in minimum_edits(malformed, correction)])
+
+# @brief Compiles an error model into a dense table of log probabilities
+# The log probability of edit op+c is cell EDIT_ROWS[op]*256 + ord(c), so
+# scoring an edit summary is a sum of list lookups instead of a product of
+# dict lookups, and cannot underflow on long words. Every letter cell gets
+# smoothing added before the table is renormalized; with no smoothing an
+# edit the model never saw has a log probability of -inf. Cells of
+# non-letters are 0, since edits involving them are not modelled and are
+# skipped (see scramble_helpers.edit_probability()).
+#
+# @param error_model The error model holding probability of different errors
+# @param smoothing Probability added to every letter edit
+#
+# @return An array of 3*256 doubles
+def error_table(error_model, smoothing=SMOOTHING):
+	letters = [chr(c) for c in range(256) if chr(c).isalpha()]
+	norm = 1+smoothing*len(EDIT_ROWS)*len(letters)
+	table = array.array("d", [0.0]*(len(EDIT_ROWS)*256))
+	for op, row in EDIT_ROWS.iteritems():
+		for letter in letters:
+			p = (error_model.get(op+letter, 0)+smoothing)/norm
+			table[row*256+ord(letter)] = math.log(p) if p > 0 else float("-inf")
+	return table
+
+# @brief Log-space error_probability(), scored against an error_table()
+#
+# @param malformed The malformed word
+# @param correction The possible correction for malformed
+# @param table The error_table() of the error model
+#
+# @return The total log probability of the errors in malformed
+def error_log_probability(malformed, correction, table):
+	total = 0.0
+	for error in minimum_edits(malformed, correction):
+		total += table[EDIT_ROWS[error[0]]*256+ord(error[1])]
+	return total
+
+# The error model scored_table() last compiled, and its table
+_scored = (None, None)
+
+# @brief The unsmoothed error_table() of an error model, compiled once
+# Unsmoothed, so it scores exactly the probabilities of the model (an edit
+# the model doesn't have is impossible). The table of the last model asked
+# for is kept, which covers a process serving one set of models at a time;
+# an error model must not be modified once it has been scored against.
+def scored_table(error_model):
+	global _scored
+	model, table = _scored
+	if model is not error_model:
+		table = error_table(error_model, 0)
+		_scored = (error_model, table)
+	return table
 		
 
-# @brief Builds error model
-# Builds error model; logs each sort of edit ("D", "I", or "R"), and counts
-# their occurrences in some misspellings corpus. Then change those counts into
-# probabilities by dividing them by the total misspellings we encountered
+# @brief Parser train_error_model() reads path with
+def parser_for(path):
+	return PARSERS.get(os.path.basename(path), appling2dat_pairs)
+
+# @brief Cache key of a training file: its parser and a hash of its contents
+def file_key(path):
+	digest = hashlib.sha1()
+	f = open(path, "rb")
+	try:
+		for block in iter(lambda: f.read(1 << 16), ""):
+			digest.update(block)
+	finally:
+		f.close()
+	return parser_for(path).__name__ + ":" + digest.hexdigest()
+
+# @brief Counts the errors in one training file; runs in a worker
 #
-# @return A dictionary containing the probability distribution of errors in corpus
-def error_model():
+# @return A (counts, pairs, seconds) tuple, counts being error -> count
+def count_file(path):
+	start = time.time()
+	counts = collections.defaultdict(int)
+	f = open(path, "r")
+	try:
+		pairs = count_pairs(parser_for(path)(f), counts)
+	finally:
+		f.close()
+	return (dict(counts), pairs, time.time()-start)
+
+def load_counts(cache_path):
+	try:
+		f = open(cache_path, "rb")
+	except IOError:
+		return {}
+	try:
+		version, counts = marshal.load(f)
+	except (EOFError, ValueError, TypeError):
+		return {}
+	finally:
+		f.close()
+	return counts if version == COUNTS_VERSION else {}
+
+# @brief Writes the counts cache; best effort
+# Written to a temporary file of this process and renamed into place, so
+# processes training at the same time never see or clobber a torn file. A
+# cache that can't be written (e.g. a read-only data directory) is skipped.
+#
+# @return True if the cache was written
+def save_counts(cache_path, counts):
+	tmp = "%s.%d.tmp" % (cache_path, os.getpid())
+	try:
+		f = open(tmp, "wb")
+		try:
+			marshal.dump((COUNTS_VERSION, counts), f)
+		finally:
+			f.close()
+		os.rename(tmp, cache_path)
+	except (IOError, OSError):
+		try:
+			os.remove(tmp)
+		except OSError:
+			pass
+		return False
+	return True
+
+# @brief Counts the errors in a set of training files
+# Files can be counted in parallel worker processes, and their partial counts
+# merged. With a cache, the counts of every file are kept under file_key(),
+# so only files that are new or have changed since the last run are
+# counted again.
+#
+# @param paths The training files; TPATH+TRAIN when omitted
+# @param processes Number of workers (at most one per file is used); 1 counts
+# in this process, without starting any, and None uses one per core
+# @param cache_path File to keep counts in between runs, or None for no cache
+#
+# @return A tuple of the merged error -> count dict and a TrainStats
+def train_counts(paths=None, processes=1, cache_path=None):
+	start = time.time()
+	if paths is None:
+		paths = [TPATH+name for name in TRAIN]
+	cached = load_counts(cache_path) if cache_path else {}
+	keys = [file_key(path) for path in paths]
+	todo = collections.OrderedDict()
+	for path, key in zip(paths, keys):
+		if key not in cached and key not in todo:
+			todo[key] = path
+
+	processes = min(processes or multiprocessing.cpu_count(), len(todo))
+	if processes > 1:
+		pool = multiprocessing.Pool(processes)
+		try:
+			results = pool.map(count_file, todo.values())
+		finally:
+			pool.close()
+			pool.join()
+	else:
+		results = map(count_file, todo.values())
+	trained_pairs = 0
+	for key, (counts, pairs, seconds) in zip(todo, results):
+		cached[key] = (counts, pairs)
+		trained_pairs += pairs
+	if cache_path and todo:
+		# Only the files trained on now are kept, so counts of files that
+		# have since changed don't pile up
+		save_counts(cache_path, dict((key, cached[key]) for key in keys))
+
+	merged = collections.defaultdict(int)
+	pairs = 0
+	for key in keys:
+		counts, file_pairs = cached[key]
+		for error, count in counts.iteritems():
+			merged[error] += count
+		pairs += file_pairs
+	seconds = time.time()-start
+	return (dict(merged), TrainStats(len(paths), len(todo),
+		len(paths)-len(todo), pairs, seconds,
+		trained_pairs/seconds if seconds else 0.0))
+
+# @brief Builds error model, see error_model()
+#
+# @param paths, processes, cache_path As for train_counts()
+#
+# @return A tuple of the error model and the TrainStats of training it
+def train_error_model(paths=None, processes=1, cache_path=None):
 	poss_edits = "DIR"
 	letters = "abcdefghijklmnopqrstuvwxyz"
 	model = {}
 	for product in itertools.product(poss_edits, letters):
 		model[''.join(product)] = 0
 
-	train_abodat(TPATH+TRAIN[0], model)
-	train_appling1dat(TPATH+TRAIN[1], model)
-	train_appling2dat(TPATH+TRAIN[2], model)
+	counts, stats = train_counts(paths, processes, cache_path)
+	for error, count in counts.iteritems():
+		model[error] += count
 
 	total = sum(model.values())
 	for error in model.keys(): model[error] = model[error]/float(total)
 
-	return model
+	return model, stats
+
+# @brief Builds error model
+# Builds error model; logs each sort of edit ("D", "I", or "R"), and counts
+# their occurrences in some misspellings corpus. Then change those counts into
+# probabilities by dividing them by the total misspellings we encountered.
+# Per-file counts are kept in COUNTS_CACHE, so unchanged files aren't parsed
+# again.
+#
+# @return A dictionary containing the probability distribution of errors in corpus
+def error_model():
+	return train_error_model(cache_path=COUNTS_CACHE)[0]
 
 #print minimum_edits("cow", "cod")
 #error_model = error_model()
+
+if __name__ == "__main__":
+	import argparse
+	parser = argparse.ArgumentParser(
+		description="Train the error model on files of misspellings")
+	parser.add_argument("files", nargs="*",
+		help="training files; the Birkbeck files under " + TPATH)
+	parser.add_argument("--processes", type=int, default=None)
+	parser.add_argument("--cache", default=COUNTS_CACHE,
+		help="file to keep per-file counts in")
+	parser.add_argument("--no-cache", action="store_true")
+	args = parser.parse_args()
+	model, stats = train_error_model(args.files or None, args.processes,
+		None if args.no_cache else args.cache)
+	print "%d pairs from %d files (%d trained, %d cached) in %.3fs, " \
+		"%.0f pairs/sec" % (stats.pairs, stats.files, stats.trained,
+		stats.cached, stats.seconds, stats.pairs_per_second)
@@ -0,0 +1,286 @@
+import collections, multiprocessing, os, re, resource, time
+import scramble_helpers
+
+# Bytes read from the corpus per call; large enough that the per-chunk Python
+# overhead is negligible, small enough that a chunk never dominates memory.
+CHUNK_SIZE = 1 << 22
+
+# Bytes count_file() reads per call. Every token of a chunk is a string of
+# its own until it is counted, so this is kept much smaller.
+TOKEN_CHUNK_SIZE = 1 << 18
+
+# What ingest_corpus() builds: the three corpus-derived models, in the same
+# shapes as similarity_model(), char_model() and word_model() return them,
+# plus an IngestStats describing the pass.
+Ingested = collections.namedtuple("Ingested",
+	["similarity_model", "char_model", "word_model_tuple", "stats"])
+
+IngestStats = collections.namedtuple("IngestStats",
+	["lines", "seconds", "lines_per_second", "peak_rss_kb"])
+
+# @brief Yields the lines of a file, read in large buffered chunks
+# Equivalent to iterating over the file, minus the line terminators, but
+# reads CHUNK_SIZE bytes at a time and only ever holds one chunk (plus the
+# partial line carried over from the previous one) in memory.
+#
+# @param f An open file
+# @param chunk_size How many bytes to read at a time
+#
+# @return Yield each line without its trailing newline
+def iter_lines(f, chunk_size=CHUNK_SIZE):
+	carry = ""
+	while True:
+		chunk = f.read(chunk_size)
+		if not chunk:
+			break
+		lines = (carry+chunk).split("\n")
+		carry = lines.pop()
+		for line in lines:
+			yield line
+	if carry:
+		yield carry
+
+# The tokens norvig.words() finds, once the text is lower cased
+WORD = re.compile("[a-z]+")
+
+# What ends a token of each kind that count_file() counts: a word at any
+# non-letter, a line at its newline
+BOUNDARIES = {"words": re.compile("[^a-zA-Z]"), "lines": re.compile("\n")}
+
+# @brief Yields the words of a file as norvig.words() finds them in its text
+# Reads and lower cases chunk_size bytes at a time. A word running up to the
+# end of a chunk may continue in the next one, so it is carried over rather
+# than returned with its chunk.
+#
+# @param f An open file
+# @param chunk_size How many bytes to read at a time
+#
+# @return Yield a list of lower case words per chunk, in order
+def iter_word_chunks(f, chunk_size=TOKEN_CHUNK_SIZE):
+	carry = ""
+	while True:
+		chunk = f.read(chunk_size)
+		if not chunk:
+			break
+		text = carry+chunk.lower()
+		words = WORD.findall(text)
+		carry = words.pop() if words and "a" <= text[-1] <= "z" else ""
+		yield words
+	if carry:
+		yield [carry]
+
+# @brief Yields the words of a file one by one; see iter_word_chunks()
+def iter_words(f, chunk_size=TOKEN_CHUNK_SIZE):
+	for words in iter_word_chunks(f, chunk_size):
+		for word in words:
+			yield word
+
+# @brief Counts how many times each word of a file occurs
+#
+# @return A dict of word -> count, as counted over norvig.words() of the text
+def count_words(f, chunk_size=TOKEN_CHUNK_SIZE):
+	counts = collections.defaultdict(int)
+	for words in iter_word_chunks(f, chunk_size):
+		for word in words:
+			counts[word] += 1
+	return dict(counts)
+
+# @brief Counts how many times each (stripped) line of a file occurs
+#
+# @return A dict of line -> count, as spell.build_counter() counts them
+def count_lines(f, chunk_size=TOKEN_CHUNK_SIZE):
+	counts = {}
+	for line in iter_lines(f, chunk_size):
+		line = line.strip()
+		counts[line] = counts.get(line, 0)+1
+	return counts
+
+COUNTERS = {"words": count_words, "lines": count_lines}
+
+# @brief Adds several partial counts together
+#
+# @param counts An iterable of dicts of token -> count
+#
+# @return A dict of token -> total count
+def merge_counts(counts):
+	merged = {}
+	for partial in counts:
+		if not merged:
+			merged.update(partial)
+			continue
+		for token, n in partial.iteritems():
+			merged[token] = merged.get(token, 0)+n
+	return merged
+
+# @brief Read-only view of the tokens of a file that start in [start, end)
+# A token straddling start belongs to the range before, so it is skipped; the
+# last token of the range is read past end up to its boundary. Every token
+# of the file thus falls in exactly one of a set of adjacent ranges.
+class _Range(object):
+	def __init__(self, f, start, end, boundary):
+		self._f = f
+		self._boundary = boundary
+		if start > 0:
+			f.seek(start-1)
+			if not boundary.match(f.read(1)):
+				start = self._find_boundary(start)
+		f.seek(start)
+		self._left = max(0, end-start)
+		self._tail = end > start and end > 0
+		self._end = end
+
+	# @return The offset just past the first boundary at or after position
+	def _find_boundary(self, position):
+		self._f.seek(position)
+		while True:
+			block = self._f.read(1 << 16)
+			if not block:
+				return position
+			match = self._boundary.search(block)
+			if match:
+				return position+match.end()
+			position += len(block)
+
+	def read(self, size):
+		if self._left > 0:
+			block = self._f.read(min(size, self._left))
+			self._left -= len(block)
+			if block and self._left == 0 and self._boundary.match(block[-1]):
+				self._tail = False
+			return block
+		if not self._tail:
+			return ""
+		# Past end: finish the token in progress
+		block = self._f.read(size)
+		match = self._boundary.search(block)
+		if match:
+			self._tail = False
+			return block[:match.end()]
+		if not block:
+			self._tail = False
+		return block
+
+def _count_range(task):
+	path, start, end, kind, chunk_size = task
+	f = open(path, "rb")
+	try:
+		return COUNTERS[kind](_Range(f, start, end, BOUNDARIES[kind]),
+			chunk_size)
+	finally:
+		f.close()
+
+# @brief Counts the tokens of a file, optionally across worker processes
+# The file is streamed, never read whole: each worker counts the tokens of
+# its own byte range a chunk at a time and returns only its counts, which are
+# then merged. Memory therefore grows with the vocabulary, not the corpus.
+# The counts are identical however the file is split.
+#
+# @param path The file to count
+# @param kind "words" to count as count_words() does, "lines" as
+# count_lines() does
+# @param processes Number of workers; 1 counts in this process
+# @param chunk_size How many bytes to read at a time
+#
+# @return A dict of token -> count
+def count_file(path, kind="words", processes=1, chunk_size=TOKEN_CHUNK_SIZE):
+	processes = processes or multiprocessing.cpu_count()
+	size = os.path.getsize(path)
+	if processes <= 1 or size < chunk_size:
+		f = open(path, "rb")
+		try:
+			return COUNTERS[kind](f, chunk_size)
+		finally:
+			f.close()
+	step = -(-size//processes)
+	tasks = [(path, start, min(size, start+step), kind, chunk_size)
+		for start in range(0, size, step)]
+	pool = multiprocessing.Pool(processes)
+	try:
+		return merge_counts(pool.imap_unordered(_count_range, tasks))
+	finally:
+		pool.close()
+		pool.join()
+
+# @brief Similarity index keys for a word; see scramble_helpers.similarity_model
+# Spells out combinatorial_bigrams() of the first and last trigram, in the
+# same order, for the common case of a word of three or more characters.
+def similarity_keys(word):
+	if len(word) < 3:
+		return [pre+suf
+			for pre in scramble_helpers.combinatorial_bigrams(word[0:3])
+			for suf in scramble_helpers.combinatorial_bigrams(word[len(word)-3:])]
+	a, b, c = word[0], word[1], word[2]
+	x, y, z = word[-3], word[-2], word[-1]
+	suffixes = (x+y, x+z, y+z)
+	return [pre+suf for pre in (a+b, a+c, b+c) for suf in suffixes]
+
+# @brief Peak resident set size of this process so far, in kilobytes
+def peak_rss_kb():
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+# @brief Builds every corpus-derived model in a single streaming pass
+# Reads filename once and fills the similarity index, the character
+# distribution and the word counts together. The results are identical to
+# calling scramble_helpers.similarity_model(), scramble_helpers.char_model()
+# and spell.word_model(spell.file_to_list(...)) on the same file, without
+# reading it three times or materializing it as a list.
+#
+# @param filename The corpus; MUST CONTAIN ONE WORD PER LINE.
+# @param chunk_size How many bytes to read at a time
+#
+# @return An Ingested tuple
+def ingest_corpus(filename, chunk_size=CHUNK_SIZE):
+	start = time.time()
+	similarity = collections.defaultdict(lambda: set())
+	letters = collections.defaultdict(int)
+	words = {}
+	# Words sharing their first and last three letters share all their
+	# similarity keys, so the keys are generated once per such pair.
+	keys_for = {}
+	lines = 0
+
+	f = open(filename, "r")
+	try:
+		for line in iter_lines(f, chunk_size):
+			lines += 1
+			word = line.strip()
+			words[word] = words.get(word, 0)+1
+			# OUR EXPERIMENTS DEAL ONLY WITH WORDS GREATER IN LENGTH THAN 6
+			if len(word) < 6:
+				continue
+			ends = (word[0:3], word[len(word)-3:])
+			keys = keys_for.get(ends)
+			if keys is None:
+				keys = keys_for[ends] = similarity_keys(word)
+			for key in keys:
+				similarity[key].add(word)
+	finally:
+		f.close()
+
+	# Character counts only need the total over all words, so they are taken
+	# with str.count over the whole word list rather than letter by letter.
+	for word, n in words.iteritems():
+		for letter in set(word):
+			letters[letter] += word.count(letter)*n
+	count = sum(letters.values())
+	# char_model() counts from a default of 1, so every seen letter carries one
+	# extra count on top of its occurrences; keep that so the models match.
+	chars = collections.defaultdict(lambda: 1)
+	for letter, n in letters.iteritems():
+		chars[letter] = float(n+1)/count
+
+	seconds = time.time()-start
+	stats = IngestStats(lines, seconds, lines/seconds if seconds else 0.0,
+		peak_rss_kb())
+	return Ingested(similarity, chars, (words, sum(words.values())), stats)
+
+# @brief One-line human readable summary of an IngestStats
+def format_stats(stats):
+	return "%d lines in %.2fs (%.0f lines/s), peak RSS %.1f MB" % (
+		stats.lines, stats.seconds, stats.lines_per_second,
+		stats.peak_rss_kb/1024.0)
+
+if __name__ == "__main__":
+	import sys
+	result = ingest_corpus(sys.argv[1] if len(sys.argv) > 1 else "corpus")
+	print format_stats(result.stats)
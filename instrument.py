@@ -0,0 +1,152 @@
+import bisect, heapq, itertools, threading, time
+import scramble_helpers
+
+# Stages scramble_helpers.suggest() reports timings for; "other" is whatever
+# else the query spent (pruning bounds, bookkeeping)
+STAGES = ["closest_words", "fallback", "probability_index", "minimum_edits",
+	"other"]
+
+# Upper bounds of the histogram buckets: seconds from 10us to about 5s, and
+# counts from 1 to 32768, doubling each bucket
+SECONDS_BUCKETS = [1e-5*2**i for i in range(20)]
+COUNT_BUCKETS = [2**i for i in range(16)]
+
+# How many of the slowest queries a Recorder keeps
+SLOWEST = 10
+
+# @brief Cumulative histogram over fixed bucket bounds
+class Histogram(object):
+	def __init__(self, bounds):
+		self.bounds = bounds
+		self.counts = [0]*(len(bounds)+1)  # the last bucket is +Inf
+		self.count = 0
+		self.sum = 0.0
+
+	def observe(self, value):
+		self.counts[bisect.bisect_left(self.bounds, value)] += 1
+		self.count += 1
+		self.sum += value
+
+	# @return A dict of the count, the sum, and a list of (upper bound,
+	# cumulative count) buckets
+	def snapshot(self):
+		buckets = []
+		total = 0
+		for bound, count in zip(self.bounds+[float("inf")], self.counts):
+			total += count
+			buckets.append((bound, total))
+		return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+# @brief Opt-in per-query instrumentation of scramble_helpers.suggest()
+# Records, for every query it runs, the total time, the time of each stage,
+# how many candidates were scored and how many of them were pruned, and
+# aggregates them into histograms. The slowest queries are kept with their
+# breakdowns. Cache hits (which never reach suggest()) are counted through
+# record_cache_hit(), e.g. as the on_hit of a cache.CachedCorrector.
+#
+# Nothing here runs unless a query goes through suggest(): with no Recorder
+# the query path reads no clocks.
+class Recorder(object):
+	# @param slowest How many of the slowest queries to keep
+	def __init__(self, slowest=SLOWEST):
+		self.histograms = {"seconds": Histogram(SECONDS_BUCKETS),
+			"candidates": Histogram(COUNT_BUCKETS),
+			"pruned": Histogram(COUNT_BUCKETS)}
+		for stage in STAGES:
+			self.histograms[stage+"_seconds"] = Histogram(SECONDS_BUCKETS)
+		self.queries = 0
+		self.cache_hits = 0
+		self._slowest = []  # min-heap of (seconds, sequence, query)
+		self._keep = slowest
+		self._sequence = itertools.count()
+		self._lock = threading.Lock()
+
+	# @brief Instrumented scramble_helpers.suggest() against a set of Models
+	#
+	# @param options Passed on to suggest(), e.g. prune=True
+	#
+	# @return What suggest() returns
+	def suggest(self, word, models, **options):
+		stats = {}
+		timings = {}
+		start = time.time()
+		result = scramble_helpers.suggest(word, models.char_model,
+			models.similarity_model, models.word_model_tuple,
+			models.error_model, stats=stats, timings=timings, **options)
+		self.record(word, time.time()-start, stats, timings)
+		return result
+
+	# @brief Records one query
+	#
+	# @param word The query
+	# @param seconds How long it took in total
+	# @param stats The stats dict suggest() filled in
+	# @param timings The timings dict suggest() filled in
+	def record(self, word, seconds, stats, timings):
+		timings = dict(timings)
+		timings["other"] = max(0.0, seconds-sum(timings.values()))
+		with self._lock:
+			self.queries += 1
+			self.histograms["seconds"].observe(seconds)
+			self.histograms["candidates"].observe(stats.get("candidates", 0))
+			self.histograms["pruned"].observe(stats.get("pruned", 0))
+			for stage in STAGES:
+				self.histograms[stage+"_seconds"].observe(timings.get(stage, 0.0))
+			if len(self._slowest) < self._keep or seconds > self._slowest[0][0]:
+				query = {"word": word, "seconds": seconds,
+					"candidates": stats.get("candidates", 0),
+					"pruned": stats.get("pruned", 0), "stages": timings}
+				entry = (seconds, next(self._sequence), query)
+				if len(self._slowest) < self._keep:
+					heapq.heappush(self._slowest, entry)
+				else:
+					heapq.heapreplace(self._slowest, entry)
+
+	def record_cache_hit(self, word):
+		with self._lock:
+			self.cache_hits += 1
+
+	# @brief The slowest queries seen, slowest first, with their breakdowns
+	def slowest(self):
+		with self._lock:
+			return [query for seconds, sequence, query in
+				sorted(self._slowest, reverse=True)]
+
+	# @brief Everything recorded, as a dict json.dump() can write
+	def snapshot(self):
+		with self._lock:
+			histograms = dict((name, histogram.snapshot())
+				for name, histogram in self.histograms.items())
+			queries, cache_hits = self.queries, self.cache_hits
+		return {"queries": queries, "cache_hits": cache_hits,
+			"histograms": histograms, "slowest": self.slowest()}
+
+	# @brief Everything recorded, in the Prometheus text exposition format
+	#
+	# @param prefix Prefix of every metric name
+	def exposition(self, prefix="suggest"):
+		snapshot = self.snapshot()
+		lines = ["# TYPE %s_queries_total counter" % prefix,
+			"%s_queries_total %d" % (prefix, snapshot["queries"]),
+			"# TYPE %s_cache_hits_total counter" % prefix,
+			"%s_cache_hits_total %d" % (prefix, snapshot["cache_hits"])]
+		for name, histogram in sorted(snapshot["histograms"].items()):
+			metric = "%s_%s" % (prefix, name)
+			lines.append("# TYPE %s histogram" % metric)
+			for bound, count in histogram["buckets"]:
+				le = "+Inf" if bound == float("inf") else repr(bound)
+				lines.append('%s_bucket{le="%s"} %d' % (metric, le, count))
+			lines.append("%s_sum %r" % (metric, histogram["sum"]))
+			lines.append("%s_count %d" % (metric, histogram["count"]))
+		return "\n".join(lines) + "\n"
+
+	# @brief The slowest queries as one line of breakdown each
+	def format_slowest(self):
+		lines = []
+		for query in self.slowest():
+			stages = "  ".join("%s %.2fms" % (stage, query["stages"][stage]*1000)
+				for stage in STAGES if stage in query["stages"])
+			lines.append("%-20s %8.2fms  %5d candidates  %5d pruned  %s" % (
+				query["word"], query["seconds"]*1000, query["candidates"],
+				query["pruned"], stages))
+		return "\n".join(lines)
@@ -0,0 +1,219 @@
+import multiprocessing, sys, threading, zlib
+import benchmark, ingest, model_bundle, scramble_helpers, similarity_index
+
+# Pruning settings tradeoff_report() compares by default, as (min_count,
+# top_n) pairs; (1, None) keeps the full vocabulary
+SETTINGS = [(1, None), (2, None), (3, None), (1, 1000), (1, 300)]
+
+# @brief The words of counts that survive pruning
+# Works on any dict of word -> count: spell.word_model() histograms, or
+# norvig.NWORDS (whose counts start at 1, so min_count=2 keeps words seen
+# once). To run norvig on a pruned vocabulary, replace its NWORDS with the
+# result.
+#
+# @param counts A dict of word -> count
+# @param min_count Drop words counted fewer times than this
+# @param top_n Then keep only this many of the most frequent words
+#
+# @return A dict of the kept words and their counts
+def prune_counts(counts, min_count=1, top_n=None):
+	kept = [(word, n) for word, n in counts.iteritems() if n >= min_count]
+	if top_n is not None and len(kept) > top_n:
+		kept.sort(key=lambda pair: (-pair[1], pair[0]))
+		kept = kept[:top_n]
+	return dict(kept)
+
+# @brief Yields (key, words) for every bucket of a similarity model
+#
+# @param similarity_model A similarity_model() dict or a SimilarityIndex
+def iter_buckets(similarity_model):
+	if hasattr(similarity_model, "buckets"):
+		return similarity_model.buckets()
+	return similarity_model.iteritems()
+
+# @brief A SimilarityIndex over only the given words of a similarity model
+def prune_similarity(similarity_model, words):
+	pruned = {}
+	for key, bucket in iter_buckets(similarity_model):
+		bucket = [word for word in bucket if word in words]
+		if bucket:
+			pruned[key] = bucket
+	return similarity_index.SimilarityIndex.from_model(pruned)
+
+# @brief Models over a pruned vocabulary
+# The word model and similarity index keep only the words that survive
+# prune_counts(); the character and error distributions are fixed-size and
+# kept as they are.
+#
+# @param models A model_bundle.Models
+#
+# @return A model_bundle.Models
+def prune_models(models, min_count=1, top_n=None):
+	counts = prune_counts(models.word_model_tuple[0], min_count, top_n)
+	return model_bundle.Models(models.error_model,
+		prune_similarity(models.similarity_model, counts), models.char_model,
+		(counts, sum(counts.values())))
+
+# @brief Approximate bytes held by a dict of word -> count: the dict itself,
+# its words, and its counts (small ints, which Python shares, count too)
+def counts_nbytes(counts):
+	return sys.getsizeof(counts) + sum(sys.getsizeof(word)+sys.getsizeof(n)
+		for word, n in counts.iteritems())
+
+# @brief Which of shards a similarity key belongs to
+# crc32 rather than hash(), so every process and run agrees.
+def shard_of(key, shards):
+	return (zlib.crc32(key) & 0xFFFFFFFF) % shards
+
+# @brief The part of a similarity model that one shard serves
+#
+# @return A SimilarityIndex over only the keys of shard
+def shard_model(similarity_model, shard, shards):
+	return similarity_index.SimilarityIndex.from_model(dict(
+		(key, bucket) for key, bucket in iter_buckets(similarity_model)
+		if shard_of(key, shards) == shard))
+
+def _serve_shard(conn, index):
+	while True:
+		word = conn.recv()
+		if word is None:
+			break
+		conn.send(index.closest_words(word))
+
+# @brief A similarity model split by bucket key across worker processes
+# Each worker holds the shard_model() of its keys. A query asks only the
+# shards owning one of its keys, and merges their answers, so the result is
+# that of the whole model. Works wherever a similarity model does, e.g. in
+# scramble_helpers.suggest().
+#
+# Shards are built one at a time, each just before its worker is started,
+# so no process needs more than one shard beyond the source model. A query
+# sends the word to all of its shards before waiting for any of them, and
+# holds only the locks of those shards, each until its reply is in, so
+# queries from several threads run concurrently on different shards.
+class ShardedIndex(object):
+	# @param similarity_model A similarity_model() dict or a SimilarityIndex
+	# @param shards How many shards to split it into
+	def __init__(self, similarity_model, shards):
+		self.shards = shards
+		self.shard_bytes = []
+		self._conns = []
+		self._workers = []
+		self._locks = [threading.Lock() for shard in range(shards)]
+		for shard in range(shards):
+			index = shard_model(similarity_model, shard, shards)
+			self.shard_bytes.append(index.nbytes())
+			ours, theirs = multiprocessing.Pipe()
+			worker = multiprocessing.Process(target=_serve_shard,
+				args=(theirs, index))
+			worker.daemon = True
+			worker.start()
+			theirs.close()
+			self._conns.append(ours)
+			self._workers.append(worker)
+			del index
+
+	# @brief Words similar to word; see scramble_helpers.closest_words
+	def closest_words(self, word):
+		owners = sorted(set(shard_of(key, self.shards)
+			for key in ingest.similarity_keys(word)))
+		found = set()
+		# Taken in shard order, so two queries can't deadlock, each holding a
+		# lock the other is waiting for
+		for shard in owners:
+			self._locks[shard].acquire()
+		try:
+			for shard in owners:
+				self._conns[shard].send(word)
+			while owners:
+				shard = owners.pop(0)
+				try:
+					found.update(self._conns[shard].recv())
+				finally:
+					self._locks[shard].release()
+		finally:
+			for shard in owners:
+				self._locks[shard].release()
+		return found
+
+	def nbytes(self):
+		return sum(self.shard_bytes)
+
+	# @brief Stops the workers
+	def close(self):
+		for lock in self._locks:
+			lock.acquire()
+		try:
+			for conn in self._conns:
+				conn.send(None)
+				conn.close()
+			for worker in self._workers:
+				worker.join()
+			self._conns = []
+		finally:
+			for lock in self._locks:
+				lock.release()
+
+# @brief Accuracy, latency and memory of the scramble corrector per setting
+#
+# @param models The full model_bundle.Models
+# @param loads benchmark.Workloads to measure on
+# @param settings (min_count, top_n) pairs
+#
+# @return A list of one dict per setting
+def tradeoff_report(models, loads, settings=SETTINGS):
+	report = []
+	for min_count, top_n in settings:
+		m = prune_models(models, min_count, top_n)
+		correct = lambda word: scramble_helpers.suggest(word, m.char_model,
+			m.similarity_model, m.word_model_tuple, m.error_model,
+			prune=True)[0]
+		row = {"min_count": min_count, "top_n": top_n,
+			"words": len(m.word_model_tuple[0]),
+			"similarity_bytes": m.similarity_model.nbytes(),
+			"word_bytes": counts_nbytes(m.word_model_tuple[0]), "workloads": {}}
+		for load in loads:
+			row["workloads"][load.name] = benchmark.run_workload(correct,
+				load.pairs)
+		report.append(row)
+	return report
+
+# @brief Formats the result of tradeoff_report() as a table
+def format_report(report):
+	lines = []
+	for row in report:
+		lines.append("min_count %d, top_n %s: %d words, similarity index "
+			"%.1f KB, word counts %.1f KB" % (row["min_count"], row["top_n"],
+			row["words"], row["similarity_bytes"]/1024.0,
+			row["word_bytes"]/1024.0))
+		for name, r in sorted(row["workloads"].items()):
+			lines.append("  %-18s %6.1f%% correct  p50 %6.2fms  p99 %6.2fms"
+				"  %8.1f q/s" % (name, r["accuracy"]*100, r["p50_ms"],
+				r["p99_ms"], r["queries_per_second"]))
+	return "\n".join(lines)
+
+if __name__ == "__main__":
+	import argparse, json
+	parser = argparse.ArgumentParser(
+		description="Compare accuracy, speed and memory of pruned lexicons")
+	parser.add_argument("--bundle", default=model_bundle.BUNDLE_PATH)
+	parser.add_argument("--corpus", default=model_bundle.CORPUS)
+	parser.add_argument("--setting", nargs=2, action="append",
+		metavar=("MIN_COUNT", "TOP_N"),
+		help="a setting to compare; TOP_N may be 'all'. Repeatable")
+	parser.add_argument("--json", default=None,
+		help="file to write the report to as JSON")
+	args = parser.parse_args()
+	settings = SETTINGS
+	if args.setting:
+		settings = [(int(min_count), None if top_n == "all" else int(top_n))
+			for min_count, top_n in args.setting]
+	models = model_bundle.load_or_build(args.bundle, args.corpus)
+	loads = [load for load in benchmark.workloads(
+		benchmark.lexicon(args.corpus), distances=()) if load.pairs]
+	report = tradeoff_report(models, loads, settings)
+	print format_report(report)
+	if args.json is not None:
+		f = open(args.json, "w")
+		json.dump(report, f, indent=2, sort_keys=True)
+		f.close()
@@ -0,0 +1,334 @@
+import collections, itertools, re, threading
+import error_model_helpers, ingest, model_bundle, similarity_index
+
+# Only words at least this long are filed in the similarity model (see
+# ingest.ingest_corpus())
+MIN_INDEXED_LENGTH = 6
+
+# Misspelling pairs are limited to the letters the error model has edits for
+NOT_LOWER = re.compile("[^a-z]")
+
+# Once the words added to or removed from the similarity index since it was
+# last built exceed this fraction of it, publish() rebuilds it
+COMPACT_FRACTION = 0.1
+
+# A published, never modified set of models and the version it was
+# published as
+Snapshot = collections.namedtuple("Snapshot", ["version", "models"])
+
+# @brief A SimilarityIndex with words added and removed on top
+# Answers closest_words() as the index rebuilt with those changes would. The
+# overlay is frozen: LiveModels builds a new one for every change it
+# publishes.
+class OverlayIndex(object):
+	# @param base A SimilarityIndex
+	# @param added Similarity key -> frozenset of words added under it
+	# @param removed A frozenset of words of base that were removed
+	def __init__(self, base, added, removed):
+		self.base = base
+		self.added = added
+		self.removed = removed
+
+	# @brief Words similar to word; see scramble_helpers.closest_words
+	def closest_words(self, word):
+		found = set(self.base.closest_words(word))
+		if self.removed:
+			found.difference_update(self.removed)
+		if self.added:
+			for key in ingest.similarity_keys(word):
+				bucket = self.added.get(key)
+				if bucket:
+					found.update(bucket)
+		return found
+
+	# @brief Every key with its words, changes applied
+	def buckets(self):
+		seen = set()
+		for key, bucket in self.base.buckets():
+			seen.add(key)
+			bucket = [word for word in bucket if word not in self.removed]
+			bucket.extend(self.added.get(key, ()))
+			if bucket:
+				yield key, bucket
+		for key, bucket in self.added.iteritems():
+			if key not in seen and bucket:
+				yield key, list(bucket)
+
+	def nbytes(self):
+		return self.base.nbytes()
+
+# @brief Word counts with changed counts on top of a shared dict
+# Reads like the dict of word -> count it stands for (lookups, membership,
+# iteration, len), for the places that read a word_model_tuple's counts.
+# Frozen like OverlayIndex.
+class OverlayCounts(object):
+	# @param base A dict of word -> count that is never modified
+	# @param changed Word -> count of the words whose count changed; 0 for
+	# words that were removed
+	def __init__(self, base, changed):
+		self.base = base
+		self.changed = changed
+		self._len = len(base) + sum((n > 0) - (word in base)
+			for word, n in changed.iteritems())
+
+	def __contains__(self, word):
+		n = self.changed.get(word)
+		if n is None:
+			return word in self.base
+		return n > 0
+
+	def __getitem__(self, word):
+		n = self.changed.get(word)
+		if n is None:
+			return self.base[word]
+		if not n:
+			raise KeyError(word)
+		return n
+
+	def get(self, word, default=None):
+		n = self.changed.get(word)
+		if n is None:
+			return self.base.get(word, default)
+		return n or default
+
+	def __len__(self):
+		return self._len
+
+	def iteritems(self):
+		for word, n in self.base.iteritems():
+			if word not in self.changed:
+				yield word, n
+		for word, n in self.changed.iteritems():
+			if n:
+				yield word, n
+
+	def __iter__(self):
+		for word, n in self.iteritems():
+			yield word
+
+	def itervalues(self):
+		for word, n in self.iteritems():
+			yield n
+
+	def keys(self):
+		return list(self)
+
+	def values(self):
+		return list(self.itervalues())
+
+	def items(self):
+		return list(self.iteritems())
+
+# @brief Models that can be updated in place while they are being served
+# Keeps the raw counts every model is derived from: word counts, letter
+# counts, error counts and the similarity postings. Words and misspelling
+# pairs can be added and removed one at a time; only the counts they touch
+# change, and probabilities are not re-normalized until publish().
+#
+# publish() derives a new Snapshot from the counts and swaps it in as one
+# attribute, so readers calling snapshot() always get a complete, consistent
+# set of models and are never blocked. Only the models that changed are
+# derived again, and the similarity index is shared with earlier snapshots
+# through an OverlayIndex of the changes, and the word counts through an
+# OverlayCounts, so publishing costs what changed, not the size of the
+# vocabulary; each is rebuilt (still without blocking readers) only once its
+# overlay grows past COMPACT_FRACTION.
+#
+# Updates and publish() are serialized by a lock; readers take none.
+class LiveModels(object):
+	# @param word_counts Word -> count, as in spell.word_model()
+	# @param error_counts Error -> count, as error_model_helpers.train_counts()
+	# returns them
+	# @param similarity A SimilarityIndex over word_counts
+	def __init__(self, word_counts, error_counts, similarity):
+		self._lock = threading.Lock()
+		self._versions = itertools.count(1)
+		self._listeners = []
+		self._words = dict(word_counts)  # never modified; see _word_counts()
+		self._word_changes = {}
+		self._total = sum(self._words.itervalues())
+		self._letters = collections.defaultdict(int)
+		for word, n in self._words.iteritems():
+			for letter in set(word):
+				self._letters[letter] += word.count(letter)*n
+		self._errors = dict(error_counts)
+		self._base = similarity
+		self._added = {}
+		self._removed = set()
+		self._changed = set(["words", "letters", "errors", "similarity"])
+		self._snapshot = None
+		self.publish()
+
+	# @brief Counts everything from the same sources model_bundle builds from
+	#
+	# @param corpus The one-word-per-line corpus
+	# @param error_paths The misspelling files; the Birkbeck files by default
+	@classmethod
+	def from_corpus(cls, corpus=model_bundle.CORPUS, error_paths=None):
+		ingested = ingest.ingest_corpus(corpus)
+		errors, stats = error_model_helpers.train_counts(error_paths)
+		return cls(ingested.word_model_tuple[0], errors,
+			similarity_index.SimilarityIndex.from_model(
+				ingested.similarity_model))
+
+	# @brief The current Snapshot; never blocks
+	def snapshot(self):
+		return self._snapshot
+
+	# @brief Calls callback(snapshot) after every publish(), e.g. to reload a
+	# server.SuggestionService
+	def subscribe(self, callback):
+		with self._lock:
+			self._listeners.append(callback)
+
+	# @brief Adds count occurrences of word
+	def add_word(self, word, count=1):
+		with self._lock:
+			self._count_word(word, count)
+
+	# @brief Removes count occurrences of word, or all of them when count is
+	# None
+	def remove_word(self, word, count=None):
+		with self._lock:
+			if count is None:
+				count = self._count(word)
+			self._count_word(word, -count)
+
+	# @brief Adds the errors of a (misspelling, correction) pair
+	def add_pair(self, misspelling, correction, count=1):
+		with self._lock:
+			self._count_pair(misspelling, correction, count)
+
+	# @brief Removes the errors of a pair added before
+	def remove_pair(self, misspelling, correction, count=1):
+		with self._lock:
+			self._count_pair(misspelling, correction, -count)
+
+	def _count(self, word):
+		n = self._word_changes.get(word)
+		if n is None:
+			return self._words.get(word, 0)
+		return n
+
+	def _count_word(self, word, delta):
+		if delta == 0:
+			return
+		have = self._count(word)
+		now = have+delta
+		if now < 0:
+			raise ValueError("%r only has %d occurrences" % (word, have))
+		if now == self._words.get(word, 0):
+			del self._word_changes[word]
+		else:
+			self._word_changes[word] = now
+		self._total += delta
+		for letter in set(word):
+			self._letters[letter] += word.count(letter)*delta
+			if not self._letters[letter]:
+				del self._letters[letter]
+		self._changed.update(["words", "letters"])
+		if len(word) >= MIN_INDEXED_LENGTH and (have == 0) != (now == 0):
+			self._index_word(word, now > 0)
+			self._changed.add("similarity")
+
+	def _index_word(self, word, present):
+		keys = ingest.similarity_keys(word)
+		if present:
+			if word in self._removed:
+				self._removed.discard(word)
+			elif word not in self._base.closest_words(word):
+				for key in keys:
+					self._added.setdefault(key, set()).add(word)
+		elif word in self._added.get(keys[0], ()):
+			for key in keys:
+				self._added[key].discard(word)
+				if not self._added[key]:
+					del self._added[key]
+		else:
+			self._removed.add(word)
+
+	def _count_pair(self, misspelling, correction, count):
+		if NOT_LOWER.search(misspelling+correction):
+			raise ValueError("misspelling pairs must be lower case letters")
+		# A pair can make the same edit more than once, so check the totals
+		deltas = collections.Counter()
+		for error in error_model_helpers.minimum_edits(misspelling, correction):
+			deltas[error] += count
+		for error, delta in deltas.iteritems():
+			if self._errors.get(error, 0)+delta < 0:
+				raise ValueError("no such pair was added")
+		for error, delta in deltas.iteritems():
+			self._errors[error] = self._errors.get(error, 0)+delta
+		self._changed.add("errors")
+
+	# @brief Derives the changed models from the counts and publishes them
+	#
+	# @return The new Snapshot
+	def publish(self):
+		with self._lock:
+			previous = self._snapshot.models if self._snapshot else None
+			changed = self._changed
+			error_model = char_model = similarity = word_model_tuple = None
+			if previous is not None:
+				error_model, similarity, char_model, word_model_tuple = previous
+			if "errors" in changed:
+				error_model = self._error_model()
+			if "letters" in changed:
+				char_model = self._char_model()
+			if "words" in changed:
+				word_model_tuple = (self._word_counts(), self._total)
+			if "similarity" in changed:
+				similarity = self._similarity()
+			self._changed = set()
+			self._snapshot = Snapshot(next(self._versions), model_bundle.Models(
+				error_model, similarity, char_model, word_model_tuple))
+			snapshot, listeners = self._snapshot, list(self._listeners)
+		for callback in listeners:
+			callback(snapshot)
+		return snapshot
+
+	# The counts shared with readers are never modified: changes are published
+	# as an overlay, until there are enough of them to fold into a new dict
+	def _word_counts(self):
+		if not self._word_changes:
+			return self._words
+		counts = OverlayCounts(self._words, dict(self._word_changes))
+		if len(self._word_changes) > COMPACT_FRACTION*len(self._words):
+			self._words = dict(counts.iteritems())
+			self._word_changes = {}
+			return self._words
+		return counts
+
+	# Same normalization as error_model_helpers.train_error_model()
+	def _error_model(self):
+		model = dict((op+letter, 0) for op in "DIR"
+			for letter in "abcdefghijklmnopqrstuvwxyz")
+		for error, n in self._errors.iteritems():
+			if n:
+				model[error] = n
+		total = float(sum(model.values()) or 1)
+		return dict((error, n/total) for error, n in model.iteritems())
+
+	# Same normalization as ingest.ingest_corpus()
+	def _char_model(self):
+		count = sum(self._letters.values())
+		chars = collections.defaultdict(lambda: 1)
+		for letter, n in self._letters.iteritems():
+			chars[letter] = float(n+1)/count
+		return chars
+
+	def _similarity(self):
+		if not self._added and not self._removed:
+			return self._base
+		overlay = OverlayIndex(self._base,
+			dict((key, frozenset(bucket)) for key, bucket in
+				self._added.iteritems()),
+			frozenset(self._removed))
+		changes = len(self._removed) + sum(len(bucket) for bucket in
+			self._added.itervalues())/9.0
+		if changes > COMPACT_FRACTION*len(self._base):
+			self._base = similarity_index.SimilarityIndex.from_model(
+				dict(overlay.buckets()))
+			self._added, self._removed = {}, set()
+			return self._base
+		return overlay
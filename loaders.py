@@ -0,0 +1,81 @@
+import threading, time
+
+_MISSING = object()
+
+# @brief A model built on first use rather than at import
+# get() builds the model the first time it is called and returns the same
+# object from then on. Concurrent first calls wait for a single build. warm()
+# starts that build in a background thread, so a process can get on with
+# other work while the model loads.
+class LazyModel(object):
+	# @param build Called with no arguments to build the model
+	def __init__(self, build):
+		self._build = build
+		self._value = _MISSING
+		self._lock = threading.Lock()
+		self.seconds = None  # how long the build took, once it has run
+
+	def get(self):
+		value = self._value
+		if value is _MISSING:
+			with self._lock:
+				if self._value is _MISSING:
+					start = time.time()
+					self._value = self._build()
+					self.seconds = time.time()-start
+				value = self._value
+		return value
+
+	@property
+	def loaded(self):
+		return self._value is not _MISSING
+
+	# @brief Builds the model in a daemon thread
+	#
+	# @return The thread; join() it to wait for the model
+	def warm(self):
+		thread = threading.Thread(target=self.get)
+		thread.daemon = True
+		thread.start()
+		return thread
+
+# @brief A LazyModel that can be used as the dict it builds
+# For module-level dicts that existing code reads directly (e.g.
+# norvig.NWORDS): lookups, membership tests and iteration all build the dict
+# on first use and then go to it.
+class LazyDict(LazyModel):
+	def __getitem__(self, key):
+		return self.get()[key]
+
+	def __contains__(self, key):
+		return key in self.get()
+
+	def __iter__(self):
+		return iter(self.get())
+
+	def __len__(self):
+		return len(self.get())
+
+	def keys(self):
+		return self.get().keys()
+
+	def values(self):
+		return self.get().values()
+
+	def items(self):
+		return self.get().items()
+
+	def iteritems(self):
+		return self.get().iteritems()
+
+	# dict.get(); LazyModel.get() with a key
+	def get(self, *key_default):
+		if key_default:
+			return LazyModel.get(self).get(*key_default)
+		return LazyModel.get(self)
+
+# @brief Warms several lazy models at once, one thread each
+#
+# @return The threads
+def warm_all(*models):
+	return [model.warm() for model in models]
@@ -0,0 +1,238 @@
+import os, mmap, marshal, struct, hashlib, collections
+import error_model_helpers, ingest, similarity_index
+
+BUNDLE_PATH = "models.bundle"
+CORPUS = "corpus"
+
+# Bump FORMAT_VERSION whenever the layout or the meaning of a section changes;
+# bundles written with any other version are treated as stale and rebuilt.
+MAGIC = "SGMB"
+FORMAT_VERSION = 3
+SECTIONS = ["error", "similarity", "char", "word"]
+
+# Sections stored as the raw strings freeze() gives for them rather than
+# marshaled: the similarity index is SimilarityIndex.pack()ed, so it can be
+# read in place from the mapping
+RAW_SECTIONS = set(["similarity"])
+
+# Every section starts at a multiple of this many bytes, so the arrays in a
+# raw section are aligned
+ALIGN = 8
+
+# Header: magic, format version, source fingerprint, number of sections. It is
+# followed by one table entry (name, offset, length) per section.
+HEADER = struct.Struct("<4sI40sI")
+ENTRY = struct.Struct("<16sQQ")
+
+# The four models main.py needs, in the shapes their builders return them
+Models = collections.namedtuple("Models",
+	["error_model", "similarity_model", "char_model", "word_model_tuple"])
+
+# @brief Lists every file the compiled models are derived from
+#
+# @param corpus The one-word-per-line corpus the corpus models are built from
+#
+# @return A list of paths: the corpus followed by the Birkbeck training files
+def source_files(corpus=CORPUS):
+	return [corpus] + [error_model_helpers.TPATH+name
+		for name in error_model_helpers.TRAIN]
+
+# @brief Cheap fingerprint of the files a bundle was compiled from
+# Hashes the path, size and modification time of every source file rather
+# than its contents, so checking a bundle never has to read a multi-GB corpus.
+# Any edit, replacement or touch of a source file changes the fingerprint.
+#
+# @param paths The source files, usually from source_files()
+#
+# @return A 40-character hex digest
+def fingerprint(paths):
+	digest = hashlib.sha1()
+	for path in paths:
+		st = os.stat(path)
+		digest.update("%s\0%d\0%d\0" % (path, st.st_size,
+			int(st.st_mtime*1000000)))
+	return digest.hexdigest()
+
+# @brief Builds all four models from the raw corpus and training files
+# The three corpus models come from one streaming pass over the corpus; see
+# ingest.ingest_corpus().
+#
+# @param corpus The one-word-per-line corpus
+#
+# @return A Models tuple
+def build_models(corpus=CORPUS):
+	corpus_models = ingest.ingest_corpus(corpus)
+	return Models(
+		error_model_helpers.error_model(),
+		corpus_models.similarity_model,
+		corpus_models.char_model,
+		corpus_models.word_model_tuple)
+
+# @brief Converts models into plain containers that marshal can store
+# defaultdicts carry a factory function, which marshal cannot serialize, so
+# they are stored as plain dicts and rebuilt by thaw(). The similarity model
+# is stored as a packed similarity_index.SimilarityIndex.
+def freeze(models):
+	index = models.similarity_model
+	if not isinstance(index, similarity_index.SimilarityIndex):
+		index = similarity_index.SimilarityIndex.from_model(index)
+	return {
+		"error": dict(models.error_model),
+		"similarity": index.pack(),
+		"char": dict(models.char_model),
+		"word": models.word_model_tuple,
+	}
+
+# @brief Inverse of freeze(); restores the defaultdict behaviour of each model
+# The similarity section is taken as the SimilarityIndex Bundle.section()
+# unpacks it into.
+def thaw(sections):
+	return Models(
+		sections["error"],
+		sections["similarity"],
+		collections.defaultdict(lambda: 1, sections["char"]),
+		sections["word"])
+
+# @brief Compiles the models into a bundle file at path
+# The bundle is written to a temporary file and renamed into place, so a
+# worker that starts while a build is running sees either the old bundle or
+# the new one, never a torn file.
+#
+# @param path Where to write the bundle
+# @param corpus The one-word-per-line corpus
+# @param models Already-built models; built from corpus when omitted
+#
+# @return The Models that were written
+def build(path=BUNDLE_PATH, corpus=CORPUS, models=None):
+	# Fingerprint before building so a source that changes mid-build leaves
+	# a bundle that is already stale rather than one that looks current.
+	stamp = fingerprint(source_files(corpus))
+	if models is None:
+		models = build_models(corpus)
+	frozen = freeze(models)
+	payloads = [frozen[name] if name in RAW_SECTIONS else
+		marshal.dumps(frozen[name]) for name in SECTIONS]
+
+	offset = HEADER.size + ENTRY.size*len(SECTIONS)
+	table = []
+	for i, (name, payload) in enumerate(zip(SECTIONS, payloads)):
+		padding = -offset % ALIGN
+		payloads[i] = "\0"*padding + payload
+		offset += padding
+		table.append(ENTRY.pack(name, offset, len(payload)))
+		offset += len(payload)
+
+	tmp = "%s.%d.tmp" % (path, os.getpid())
+	f = open(tmp, "wb")
+	try:
+		f.write(HEADER.pack(MAGIC, FORMAT_VERSION, stamp, len(SECTIONS)))
+		f.write("".join(table))
+		for payload in payloads:
+			f.write(payload)
+	finally:
+		f.close()
+	os.rename(tmp, path)
+	return models
+
+# @brief A read-only, memory-mapped view of a compiled bundle
+# The file is mapped rather than read, and a section is only decoded when it
+# is first asked for. With numpy, the similarity index (by far the largest
+# model) is used in place from the mapping, so processes that load the same
+# bundle share those pages through the OS page cache; the other sections are
+# unmarshaled into each process's own memory.
+class Bundle(object):
+	def __init__(self, path=BUNDLE_PATH):
+		f = open(path, "rb")
+		try:
+			self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		finally:
+			f.close()
+		magic, self.version, self.fingerprint, count = \
+			HEADER.unpack_from(self._map, 0)
+		if magic != MAGIC:
+			self._map.close()
+			raise ValueError("%s is not a model bundle" % path)
+		self._table = {}
+		for i in range(count):
+			name, offset, length = \
+				ENTRY.unpack_from(self._map, HEADER.size + i*ENTRY.size)
+			self._table[name.rstrip("\0")] = (offset, length)
+		self._sections = {}
+		self._mapped = False  # whether a section still reads from _map
+
+	# @brief True if this bundle was compiled from the current source files
+	def is_current(self, corpus=CORPUS):
+		try:
+			stamp = fingerprint(source_files(corpus))
+		except OSError:
+			return False
+		return self.version == FORMAT_VERSION and self.fingerprint == stamp
+
+	# @brief Decodes (once) and returns the named section
+	def section(self, name):
+		if name not in self._sections:
+			offset, length = self._table[name]
+			if name in RAW_SECTIONS:
+				index = similarity_index.SimilarityIndex.unpack_from(self._map,
+					offset)
+				self._mapped = similarity_index.numpy is not None
+				self._sections[name] = index
+			else:
+				self._sections[name] = \
+					marshal.loads(self._map[offset:offset+length])
+		return self._sections[name]
+
+	# @brief All four models, in the same shapes their builders return
+	def models(self):
+		return thaw(dict((name, self.section(name)) for name in SECTIONS))
+
+	# @brief Releases the mapping
+	# A similarity index unpacked in place still reads from it, so then the
+	# mapping is only dropped here, and unmapped once the index is garbage.
+	def close(self):
+		if not self._mapped:
+			self._map.close()
+		self._map = None
+		self._sections = {}
+
+# @brief Loads the bundle at path, recompiling it first if it is stale
+# A bundle is stale when it is missing, was written by a different
+# FORMAT_VERSION, or any of the corpus and training files has changed since it
+# was built.
+#
+# @param path The bundle file
+# @param corpus The one-word-per-line corpus the bundle is built from
+#
+# @return A Models tuple
+def load_or_build(path=BUNDLE_PATH, corpus=CORPUS):
+	return load_versioned(path, corpus)[0]
+
+# @brief load_or_build(), also returning the fingerprint of the bundle the
+# models were loaded from, e.g. as a cache version
+#
+# @return A (Models, fingerprint) tuple
+def load_versioned(path=BUNDLE_PATH, corpus=CORPUS):
+	if os.path.exists(path):
+		try:
+			bundle = Bundle(path)
+		except (ValueError, struct.error):
+			bundle = None
+		if bundle is not None:
+			if bundle.is_current(corpus):
+				return _load(bundle)
+			bundle.close()
+	build(path, corpus)
+	return _load(Bundle(path))
+
+def _load(bundle):
+	try:
+		return bundle.models(), bundle.fingerprint
+	finally:
+		bundle.close()
+
+if __name__ == "__main__":
+	import sys
+	corpus = sys.argv[1] if len(sys.argv) > 1 else CORPUS
+	path = sys.argv[2] if len(sys.argv) > 2 else BUNDLE_PATH
+	build(path, corpus)
+	print "WROTE MODEL BUNDLE " + path
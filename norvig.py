@@ -9,7 +9,8 @@
 # THIS SOFTWARE IS PRESENTED AS-IS, AND CARRIES NO IMPLICATION OF WARRANTY,
 # NEITHER BY US NOR DR NORVIG.
 
-import re, collections
+import re, collections, heapq
+import ingest, loaders
 
 def words(text): return re.findall('[a-z]+', text.lower()) 
 
@@ -19,7 +20,24 @@ def train(features):
         model[f] += 1
     return model
 
-NWORDS = train(words(file('big.txt').read()))
+# Same model as train(words(file(path).read())), but counted a chunk at a
+# time (and across worker processes) without reading the whole file
+def train_file(path, processes=1):
+    model = collections.defaultdict(lambda: 1)
+    for f, n in ingest.count_file(path, "words", processes).iteritems():
+        model[f] = n + 1
+    return model
+
+# Built from big.txt the first time it is used, not on import
+NWORDS = loaders.LazyDict(lambda: train_file('big.txt'))
+
+# The built NWORDS dict (or whatever dict NWORDS was replaced with). Resolve
+# it once per call: membership tests on the LazyDict itself cost three calls
+# each in the edit loops.
+def nwords():
+    if isinstance(NWORDS, loaders.LazyDict):
+        return NWORDS.get()
+    return NWORDS
 
 alphabet = 'abcdefghijklmnopqrstuvwxyz'
 
@@ -32,10 +50,49 @@ def edits1(word):
    return set(deletes + transposes + replaces + inserts)
 
 def known_edits2(word):
-    return set(e2 for e1 in edits1(word) for e2 in edits1(e1) if e2 in NWORDS)
+    model = nwords()
+    return set(e2 for e1 in edits1(word) for e2 in edits1(e1) if e2 in model)
+
+def known(words):
+    model = nwords()
+    return set(w for w in words if w in model)
+
+# Pass index=symspell.DeleteIndex(NWORDS) to find the same candidates by
+# looking up the word's deletes instead of generating every edit of it.
+def correct(word, index=None):
+    if index is not None:
+        candidates = known([word]) or index.lookup(word, 1) or index.lookup(word, 2) or [word]
+    else:
+        candidates = known([word]) or known(edits1(word)) or known_edits2(word) or [word]
+    return max(candidates, key=nwords().get)
 
-def known(words): return set(w for w in words if w in NWORDS)
+# Known candidates for word, one set per edit distance; each set is only
+# generated when the previous ones have been used.
+def candidate_tiers(word, index=None):
+    yield known([word])
+    if index is not None:
+        yield index.lookup(word, 1)
+        yield index.lookup(word, 2)
+    else:
+        yield known(edits1(word))
+        yield known_edits2(word)
 
-def correct(word):
-    candidates = known([word]) or known(edits1(word)) or known_edits2(word) or [word]
-    return max(candidates, key=NWORDS.get)
\ No newline at end of file
+# Like correct(), but returns up to k (word, count) pairs, best first: the
+# known words at the smallest edit distance, most frequent first, then those
+# one edit further away. Words counted less than threshold are left out, and
+# edits two away are only generated when fewer than k closer words qualify.
+# Unlike correct(), returns an empty list when no known word is close enough.
+def correct_top(word, k=5, threshold=None, index=None):
+    model = nwords()
+    ranked = []
+    seen = set()
+    for candidates in candidate_tiers(word, index):
+        candidates = [w for w in candidates if w not in seen and
+                      (threshold is None or model[w] >= threshold)]
+        seen.update(candidates)
+        best = heapq.nlargest(k - len(ranked), candidates,
+                              key=lambda w: (model[w], w))
+        ranked.extend((w, model[w]) for w in best)
+        if len(ranked) >= k:
+            break
+    return ranked
\ No newline at end of file
@@ -0,0 +1,140 @@
+import re
+import batch_scoring, model_bundle, scramble_helpers
+
+# Bytes read from the input at a time
+CHUNK_SIZE = 1 << 16
+
+# Tokens held back at a time; unknown words are deduplicated and corrected
+# together within one window, and the window bounds memory whatever the size
+# of the input.
+WINDOW = 4096
+
+# Shorter words are never corrected: the similarity index only holds words of
+# at least this many letters, so the corrector can't suggest anything close to
+# them (main.py skips them for the same reason).
+MIN_CORRECTED_LENGTH = 6
+
+# A token is a run of letters (a word) or a run of anything else, so joining
+# the tokens of a text gives back the text exactly.
+TOKEN = re.compile("[A-Za-z]+|[^A-Za-z]+")
+
+# @brief Splits a stream into word and non-word tokens
+# Reads chunk_size bytes at a time. The last token of a chunk may continue in
+# the next one, so it is carried over rather than yielded.
+#
+# @param f An open file
+# @param chunk_size How many bytes to read at a time
+#
+# @return Yield (is_word, text) pairs that concatenate back to the input
+def tokenize(f, chunk_size=CHUNK_SIZE):
+	carry = ""
+	while True:
+		chunk = f.read(chunk_size)
+		if not chunk:
+			break
+		tokens = TOKEN.findall(carry+chunk)
+		carry = tokens.pop()
+		for token in tokens:
+			yield (token[0].isalpha(), token)
+	if carry:
+		yield (carry[0].isalpha(), carry)
+
+# @brief Gives a lower case correction the case of the word it replaces
+def match_case(word, correction):
+	if word.isupper() and len(word) > 1:
+		return correction.upper()
+	if word[0].isupper():
+		return correction[:1].upper() + correction[1:]
+	return correction
+
+# @brief Corrects a list of lower case words against a set of Models
+#
+# @return One correction per word; a word with no candidates is kept
+def correct_words(words, models):
+	m = models
+	if batch_scoring.numpy is not None:
+		suggest = batch_scoring.suggest_batched
+	else:
+		suggest = lambda *args: scramble_helpers.suggest(*args, prune=True)
+	corrections = []
+	for word in words:
+		suggestion = suggest(word, m.char_model, m.similarity_model,
+			m.word_model_tuple, m.error_model)[0]
+		corrections.append(suggestion or word)
+	return corrections
+
+# @brief Corrects a stream of text, keeping its layout
+# Known words (in any case) are passed through after a dictionary lookup, and
+# words shorter than MIN_CORRECTED_LENGTH are passed through as they are. The
+# distinct unknown words of each window of tokens are corrected as one
+# batch, and the window is then emitted with each correction in the case of
+# the word it replaces.
+#
+# @param tokens (is_word, text) pairs, as tokenize() yields them
+# @param models The Models to correct against
+# @param window How many tokens to correct at a time
+# @param correct Corrects a list of lower case words; defaults to
+# correct_words() against models
+#
+# @return Yield the corrected text, a window at a time
+def correct_stream(tokens, models, window=WINDOW, correct=None):
+	if correct is None:
+		correct = lambda words: correct_words(words, models)
+	known = models.word_model_tuple[0]
+	pending = []
+	for token in tokens:
+		pending.append(token)
+		if len(pending) >= window:
+			yield _correct_window(pending, known, correct)
+			pending = []
+	if pending:
+		yield _correct_window(pending, known, correct)
+
+def _correct_window(tokens, known, correct):
+	unknown = {}
+	for is_word, text in tokens:
+		if is_word and len(text) >= MIN_CORRECTED_LENGTH and text not in known:
+			lower = text.lower()
+			if lower not in known:
+				unknown[lower] = None
+	if unknown:
+		words = list(unknown)
+		unknown = dict(zip(words, correct(words)))
+	out = []
+	for is_word, text in tokens:
+		if is_word and text not in known:
+			correction = unknown.get(text.lower())
+			if correction is not None:
+				text = match_case(text, correction)
+		out.append(text)
+	return "".join(out)
+
+# @brief Corrects everything read from one file into another
+#
+# @param source An open file to read
+# @param sink An open file to write
+def correct_file(source, sink, models, window=WINDOW):
+	for text in correct_stream(tokenize(source), models, window):
+		sink.write(text)
+		sink.flush()
+
+if __name__ == "__main__":
+	import argparse, sys
+	parser = argparse.ArgumentParser(
+		description="Correct the misspelled words of a document")
+	parser.add_argument("input", nargs="?", default="-",
+		help="file to read; - for stdin")
+	parser.add_argument("-o", "--output", default="-",
+		help="file to write; - for stdout")
+	parser.add_argument("--window", type=int, default=WINDOW)
+	parser.add_argument("--bundle", default=model_bundle.BUNDLE_PATH)
+	parser.add_argument("--corpus", default=model_bundle.CORPUS)
+	args = parser.parse_args()
+	models = model_bundle.load_or_build(args.bundle, args.corpus)
+	source = sys.stdin if args.input == "-" else open(args.input, "r")
+	sink = sys.stdout if args.output == "-" else open(args.output, "w")
+	try:
+		correct_file(source, sink, models, args.window)
+	finally:
+		if sink is not sys.stdout:
+			sink.close()
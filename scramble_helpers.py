@@ -1,4 +1,12 @@
-import itertools, collections, error_model_helpers, re
+import itertools, collections, error_model_helpers, math, re, time, heapq
+
+NON_LETTER = re.compile("[^a-zA-Z]")
+
+# suggest() falls back to a bounded edit distance search when the similarity
+# model finds fewer candidates than this ...
+FALLBACK_CANDIDATES = 3
+# ... and then also considers every word within this many edits
+FALLBACK_DISTANCE = 2
 
 # @brief Combinatorially generate all bigrams for string, return with yield
 # Combinatorially generates all possible bigrams for some word. So in the case
@@ -132,6 +140,61 @@ def probability_index(misspell,correction,char_model):
 		probability*=char_model[letter]**overlap[letter]
 	return probability
 
+# @brief Probability that correction is misspelled as word, per error_model
+# The product of the probabilities of each edit in the minimum edit summary
+# between correction and word, taken as a sum of log probabilities looked up
+# in the dense error_model_helpers.scored_table() of error_model. Edits
+# involving non-letters are not in the error model and are skipped (their
+# cells are 0).
+#
+# @param correction The possible correction
+# @param word The (lower case) misspelled word
+# @param error_model Probability distribution for spelling errors
+#
+# @return The product of the probabilities of each edit
+def edit_probability(correction, word, error_model):
+	return edit_table_probability(correction, word,
+		error_model_helpers.scored_table(error_model))
+
+# @brief edit_probability() against an already compiled table
+def edit_table_probability(correction, word, table):
+	return math.exp(error_model_helpers.error_log_probability(correction, word,
+		table))
+
+# @brief Cheap upper bound on edit_probability(correction, word, error_model)
+# Every edit adds at most the largest log probability in the error table, and
+# no alignment of two words needs fewer edits than the number of characters
+# one word has that the other lacks (which also covers their difference in
+# length). Edits involving non-letters are skipped by edit_probability(), so
+# no bound tighter than 1 is claimed when either word has one.
+#
+# The bound is summed the way the real log probability is (further edits
+# only add terms no greater than 0), so it stays an upper bound after
+# rounding too.
+#
+# @param correction The possible correction
+# @param word The (lower case) misspelled word
+# @param max_log The largest log probability in the error table; see
+# max_log_probability()
+#
+# @return A number no smaller than edit_probability(correction, word, ...)
+def edit_probability_bound(correction, word, max_log):
+	if NON_LETTER.search(correction) or NON_LETTER.search(word):
+		return 1
+	overlap = 0
+	for letter in set(word):
+		overlap += min(word.count(letter), correction.count(letter))
+	bound = 0.0
+	for i in range(max(len(word), len(correction))-overlap):
+		bound += max_log
+	return math.exp(bound)
+
+# @brief The largest log probability of a letter edit in an error table
+def max_log_probability(table):
+	return max(table[row*256+ord(letter)]
+		for row in error_model_helpers.EDIT_ROWS.itervalues()
+		for letter in "abcdefghijklmnopqrstuvwxyz")
+
 # @brief Suggests a word for some misspelled word using provided models
 # Suggests a possible correction for word based on the provided char_model,
 # similarity_model, and error_model. These can all be obtained from their
@@ -141,18 +204,51 @@ def probability_index(misspell,correction,char_model):
 # @param char_model Probability distribution for chars in given language
 # @param similarity_model Helps us find words that are "like" our misspelling
 # @param error_model Probability distribution for spelling errors
+# @param prune Skip the edit summary of candidates that provably cannot beat
+# the current best; the result is the same as without pruning
+# @param stats Optional dict; receives the number of "candidates" and how
+# many of them were "pruned"
+# @param fallback Optional trie.LevenshteinTrie over the lexicon; when the
+# similarity model finds fewer than FALLBACK_CANDIDATES words (e.g. because
+# the ends of word are badly garbled), the words within FALLBACK_DISTANCE
+# edits of word are considered as well
+# @param timings Optional dict; receives the seconds spent in each stage:
+# "closest_words", "fallback", "probability_index" and "minimum_edits" (the
+# edit summaries and their error probabilities). Without it no clock is read.
 #
 # @return A tuple of the suggestion, the original word, and the probability
-def suggest(word,char_model,similarity_model,word_model_tuple, error_model):
+def suggest(word,char_model,similarity_model,word_model_tuple, error_model,
+		prune=False, stats=None, fallback=None, timings=None):
+	if timings is not None:
+		overlap_seconds = edit_seconds = 0.0
+		mark = time.time()
 	# Make word lower case and find the possible corrections "like" it.
 	word = word.lower()
 	similar_words=closest_words(word,similarity_model)
+	if timings is not None:
+		now = time.time()
+		timings["closest_words"] = now-mark
+		mark = now
+	if fallback is not None and len(similar_words) < FALLBACK_CANDIDATES:
+		similar_words = set(similar_words)
+		similar_words.update(
+			found for found, distance in fallback.within(word, FALLBACK_DISTANCE))
+	if timings is not None:
+		timings["fallback"] = time.time()-mark
 	current_best=("",1)  # Will hold our current-best word and its probability
 	                     # in form (word, probability)
+	table = error_model_helpers.scored_table(error_model)
+	if prune:
+		max_log = max_log_probability(table)
+	pruned = 0
 	# Cycle through possible corrections and find the "best" correction
 	for correction in similar_words:
 		correction = correction.lower()
+		if timings is not None:
+			mark = time.time()
 		probability=probability_index(word,correction,char_model)
+		if timings is not None:
+			overlap_seconds += time.time()-mark
 		"""if correction in word_model_tuple[0]:
 			probability *= 1-word_model_tuple[0][correction]/float(word_model_tuple[1])
 		else:
@@ -160,14 +256,20 @@ def suggest(word,char_model,similarity_model,word_model_tuple, error_model):
 			word_model_tuple[0][correction] = 1
 			probability *= 1-word_model_tuple[0][correction]/float(word_model_tuple[1])"""
 
-		edits = error_model_helpers.minimum_edits(correction, word)
-		
-		total_error_prob = 1
-		for edit in edits:
-			if re.search("[^a-zA-Z]+", edit) != None or re.search("[^a-zA-Z]+", edit) != None:
-				continue
-			total_error_prob *= error_model[edit]
-		probability -= total_error_prob
+		# PRUNING: the score can be no lower than the overlap probability minus
+		# the largest error probability this pair could have. A candidate only
+		# replaces current_best if it is strictly lower, so one whose bound
+		# already isn't can be skipped without aligning it.
+		if prune and probability - edit_probability_bound(
+				correction, word, max_log) >= current_best[1]:
+			pruned += 1
+			continue
+
+		if timings is not None:
+			mark = time.time()
+		probability -= edit_table_probability(correction, word, table)
+		if timings is not None:
+			edit_seconds += time.time()-mark
 
 		# DEBUGGING
 		#print correction, probability
@@ -187,8 +289,70 @@ def suggest(word,char_model,similarity_model,word_model_tuple, error_model):
 			if len(new_ed) < len(curr_ed):
 				current_best = (correction, probability)
 		"""
+	if stats is not None:
+		stats["candidates"] = len(similar_words)
+		stats["pruned"] = pruned
+	if timings is not None:
+		timings["probability_index"] = overlap_seconds
+		timings["minimum_edits"] = edit_seconds
 	return (current_best[0], word, current_best[1])
 
+# @brief The k best suggestions for some misspelled word
+# Scores candidates as suggest() does, but keeps the k best in a bounded heap
+# instead of only the best one. Candidates are visited in order of a lower
+# bound on their score (their overlap probability minus
+# edit_probability_bound()), so as soon as the bound of the next candidate
+# cannot beat the k-th best score kept so far, or the threshold, no candidate
+# after it can either and the scan stops.
+#
+# @param word The word to correct
+# @param char_model Probability distribution for chars in given language
+# @param similarity_model Helps us find words that are "like" our misspelling
+# @param error_model Probability distribution for spelling errors
+# @param k How many suggestions to return at most
+# @param threshold Only suggestions scoring below this are returned; like
+# suggest(), the default never returns one scoring 1 or more
+# @param stats Optional dict; receives the number of "candidates" and how
+# many of them were "pruned" without aligning them
+# @param fallback Optional trie.LevenshteinTrie, as for suggest()
+#
+# @return A list of (suggestion, score) pairs, best (lowest score) first
+def suggest_top(word,char_model,similarity_model,word_model_tuple,
+		error_model, k=5, threshold=1, stats=None, fallback=None):
+	word = word.lower()
+	similar_words=closest_words(word,similarity_model)
+	if fallback is not None and len(similar_words) < FALLBACK_CANDIDATES:
+		similar_words = set(similar_words)
+		similar_words.update(
+			found for found, distance in fallback.within(word, FALLBACK_DISTANCE))
+	table = error_model_helpers.scored_table(error_model)
+	max_log = max_log_probability(table)
+	bounded = []
+	for correction in set(correction.lower() for correction in similar_words):
+		probability = probability_index(word,correction,char_model)
+		bounded.append((probability - edit_probability_bound(correction, word,
+			max_log), probability, correction))
+	bounded.sort()
+
+	kept = []  # (-score, correction), so the worst kept suggestion is on top
+	scored = 0
+	for bound, probability, correction in bounded:
+		cutoff = -kept[0][0] if k > 0 and len(kept) == k else threshold
+		if k <= 0 or bound >= cutoff:
+			break
+		probability -= edit_table_probability(correction, word, table)
+		scored += 1
+		if probability < cutoff:
+			if len(kept) < k:
+				heapq.heappush(kept, (-probability, correction))
+			else:
+				heapq.heapreplace(kept, (-probability, correction))
+	if stats is not None:
+		stats["candidates"] = len(bounded)
+		stats["pruned"] = len(bounded)-scored
+	return [(correction, -negated) for negated, correction in
+		sorted(kept, key=lambda entry: (-entry[0], entry[1]))]
+
 # @brief Find words closest to some string; must be longer than 6 chars
 # Find words that are most "like" some string; our experiment is only
 # concerned with words greater in length than 6 chars, so all words that are
@@ -200,18 +364,30 @@ def suggest(word,char_model,similarity_model,word_model_tuple, error_model):
 # for that method) and looking at every word in that similarity space so
 # defined.
 #
+# The lookup is read-only: similarity_model is never modified, so one model
+# can serve any number of queries (and threads) without growing. A compact
+# similarity_index.SimilarityIndex can be used in place of the
+# similarity_model; it answers the same question itself.
+#
 # @param word The word to find closest words of
 # @param similarity_model The model we use to find similar words
 #
 # @return A set() of similar words
 def closest_words(word,similarity_model):
+	if hasattr(similarity_model, "closest_words"):
+		return similarity_model.closest_words(word)
 	similar_words = set()
 	# Our algorithm is only concerned with words longer than 6 chars
 	if word >= 6:
 		# Find all similar words using the similarity index
 		for pre in combinatorial_bigrams(word[:3]):
 			for suf in combinatorial_bigrams(word[len(word)-3:]):
-				similar_words = similar_words.union(similarity_model[pre+suf])
+				# get() rather than [] so that looking up a key the model has
+				# never seen doesn't insert an empty set into it, and update()
+				# rather than union() so the result isn't copied for every key
+				bucket = similarity_model.get(pre+suf)
+				if bucket:
+					similar_words.update(bucket)
 	return similar_words
 
 """TESTING STUFF"""
@@ -0,0 +1,290 @@
+import BaseHTTPServer, SocketServer, Queue, collections, itertools, json, \
+	threading, time, urlparse
+import batch_scoring, benchmark, instrument, model_bundle, scramble_helpers
+import cache as correction_cache
+
+# Requests that arrive within MAX_WAIT seconds of each other are scored as
+# one micro-batch of at most MAX_BATCH words.
+MAX_BATCH = 64
+MAX_WAIT = 0.002
+
+# How many recent request latencies the percentiles are computed over
+LATENCY_WINDOW = 10000
+
+# @brief Request latency and throughput counters
+# Request threads record without a lock: deque.append() and next() on an
+# itertools.count are atomic in CPython. Batch counters are only written by
+# the single MicroBatcher worker.
+class LatencyStats(object):
+	def __init__(self, window=LATENCY_WINDOW):
+		self.started = time.time()
+		self._latencies = collections.deque(maxlen=window)
+		self._requests = itertools.count(1)
+		self.requests = self.words = self.batches = 0
+
+	def record_request(self, seconds):
+		self._latencies.append(seconds)
+		self.requests = next(self._requests)
+
+	def record_batch(self, words):
+		self.batches += 1
+		self.words += words
+
+	# @brief Latency percentile over the recent window, in seconds
+	def percentile(self, p):
+		return benchmark.percentile(sorted(list(self._latencies)), p)
+
+	def snapshot(self):
+		elapsed = time.time()-self.started
+		return {
+			"requests": self.requests,
+			"words": self.words,
+			"batches": self.batches,
+			"uptime_seconds": elapsed,
+			"requests_per_second": self.requests/elapsed if elapsed else 0.0,
+			"words_per_second": self.words/elapsed if elapsed else 0.0,
+			"p50_ms": self.percentile(50)*1000,
+			"p99_ms": self.percentile(99)*1000,
+		}
+
+# @brief Groups concurrently submitted words into micro-batches
+# Callers block in submit() while a single worker thread drains the queue:
+# it waits for a first request, keeps collecting for up to max_wait seconds
+# or until max_batch words are pending, scores the distinct words of the
+# batch in one call to score_many, and hands every caller its results. If
+# that call fails, the words are scored one at a time, so only the words
+# that fail get an error.
+class MicroBatcher(object):
+	# @param score_many Scores a list of distinct words; returns one result
+	# per word, in order
+	def __init__(self, score_many, stats, max_batch=MAX_BATCH,
+			max_wait=MAX_WAIT):
+		self._score_many = score_many
+		self._stats = stats
+		self._max_batch = max_batch
+		self._max_wait = max_wait
+		self._queue = Queue.Queue()
+		worker = threading.Thread(target=self._run)
+		worker.daemon = True
+		worker.start()
+
+	# @brief Scores words as part of the next micro-batch
+	#
+	# @param words A list of words to correct
+	#
+	# @return One score_many() result per word, in order
+	def submit(self, words):
+		pending = (words, threading.Event(), [])
+		self._queue.put(pending)
+		pending[1].wait()
+		return pending[2]
+
+	def _run(self):
+		while True:
+			batch = [self._queue.get()]
+			size = len(batch[0][0])
+			deadline = time.time()+self._max_wait
+			while size < self._max_batch:
+				remaining = deadline-time.time()
+				if remaining <= 0:
+					break
+				try:
+					batch.append(self._queue.get(timeout=remaining))
+				except Queue.Empty:
+					break
+				size += len(batch[-1][0])
+			self._stats.record_batch(size)
+
+			distinct = list(collections.OrderedDict.fromkeys(
+				word for words, done, out in batch for word in words))
+			try:
+				results = dict(zip(distinct, self._score_many(distinct)))
+			except Exception:
+				results = {}
+				for word in distinct:
+					try:
+						results[word] = self._score_many([word])[0]
+					except Exception, e:
+						results[word] = e
+			for words, done, out in batch:
+				out.extend(results[word] for word in words)
+				done.set()
+
+# @brief Corrects words against one set of models at a time
+# The models are never modified after loading (closest_words() is read-only),
+# so any number of request threads share them without locking.
+#
+# Each micro-batch is scored by suggest_many(), which scores the candidates
+# of all its words together (see batch_scoring.suggest_many()). With a
+# cache, the batcher looks each word up in it and only scores misses. With
+# an instrument.Recorder, every miss is scored through it, one word at a
+# time so each query gets its own breakdown, and cache hits are counted by
+# it.
+class SuggestionService(object):
+	def __init__(self, models, max_batch=MAX_BATCH, max_wait=MAX_WAIT,
+			cache=None, version=None, recorder=None):
+		self.models = models
+		self.stats = LatencyStats()
+		self.recorder = recorder
+		score_many = self.suggest_many
+		if cache is not None:
+			self._cached = correction_cache.CachedCorrector(self.suggest_one,
+				cache, version,
+				on_hit=recorder.record_cache_hit if recorder else None,
+				correct_many=self.suggest_many)
+			score_many = self._cached.many
+		self.cache = cache
+		self._batcher = MicroBatcher(score_many, self.stats, max_batch,
+			max_wait)
+
+	# @brief Switches to new models, e.g. a live_models.Snapshot's
+	# Requests already being scored finish against the old models; entries
+	# cached for them are never returned again.
+	def reload(self, models, version):
+		self.models = models
+		if self.cache is not None:
+			self._cached.reload(self.suggest_one, version, self.suggest_many)
+
+	# @brief Corrects a single word without batching
+	#
+	# @return A (suggestion, word, probability) tuple, as suggest() returns
+	def suggest_one(self, word):
+		m = self.models
+		if self.recorder is not None:
+			return self.recorder.suggest(word, m, prune=True)
+		if batch_scoring.numpy is not None:
+			return batch_scoring.suggest_batched(word, m.char_model,
+				m.similarity_model, m.word_model_tuple, m.error_model)
+		return scramble_helpers.suggest(word, m.char_model,
+			m.similarity_model, m.word_model_tuple, m.error_model, prune=True)
+
+	# @brief Corrects a list of words without batching them with others
+	#
+	# @return One (suggestion, word, probability) tuple per word
+	def suggest_many(self, words):
+		m = self.models
+		if self.recorder is not None:
+			return [self.recorder.suggest(word, m, prune=True) for word in words]
+		return batch_scoring.suggest_many(words, m.char_model,
+			m.similarity_model, m.word_model_tuple, m.error_model)
+
+	# @brief Corrects a list of words as part of the next micro-batch
+	def suggest(self, words):
+		start = time.time()
+		results = self._batcher.submit(words)
+		self.stats.record_request(time.time()-start)
+		return results
+
+class ThreadingHTTPServer(SocketServer.ThreadingMixIn,
+		BaseHTTPServer.HTTPServer):
+	daemon_threads = True
+
+# @brief HTTP front end for a SuggestionService
+#   GET  /suggest?word=a&word=b   corrects one or more words
+#   POST /suggest {"words": [...]} corrects a batch
+#   GET  /stats                   latency and throughput counters
+#   GET  /metrics                 per-stage histograms, when instrumented
+class SuggestionHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+	service = None  # set by serve()
+
+	def do_GET(self):
+		url = urlparse.urlparse(self.path)
+		if url.path == "/stats":
+			stats = self.service.stats.snapshot()
+			if self.service.cache is not None:
+				stats["cache"] = self.service.cache.stats()
+			if self.service.recorder is not None:
+				stats["slowest"] = self.service.recorder.slowest()
+			self._reply(200, stats)
+		elif url.path == "/metrics" and self.service.recorder is not None:
+			body = self.service.recorder.exposition()
+			self.send_response(200)
+			self.send_header("Content-Type", "text/plain; version=0.0.4")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+		elif url.path == "/suggest":
+			self._suggest(urlparse.parse_qs(url.query).get("word", []))
+		else:
+			self._reply(404, {"error": "unknown path " + url.path})
+
+	def do_POST(self):
+		if urlparse.urlparse(self.path).path != "/suggest":
+			self._reply(404, {"error": "unknown path " + self.path})
+			return
+		try:
+			body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+			words = json.loads(body)["words"]
+		except (ValueError, KeyError, TypeError):
+			self._reply(400, {"error": 'expected {"words": [...]}'})
+			return
+		self._suggest(words)
+
+	def _suggest(self, words):
+		if not isinstance(words, list) or \
+				not all(isinstance(word, basestring) for word in words):
+			self._reply(400, {"error": '"words" must be a list of strings'})
+			return
+		if not words:
+			self._reply(400, {"error": "no words given"})
+			return
+		words = [word.encode("utf-8") if isinstance(word, unicode) else word
+			for word in words]
+		results = []
+		for word, result in zip(words, self.service.suggest(words)):
+			if isinstance(result, Exception):
+				results.append({"word": word, "error": str(result)})
+			else:
+				results.append({"word": word, "suggestion": result[0],
+					"probability": result[2]})
+		self._reply(200, {"results": results})
+
+	def _reply(self, status, payload):
+		body = json.dumps(payload)
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		pass
+
+# @brief Serves suggestions over HTTP on localhost until interrupted
+#
+# @param service A SuggestionService
+# @param port The TCP port to listen on
+def serve(service, port):
+	class Handler(SuggestionHandler):
+		pass
+	Handler.service = service
+	httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+	try:
+		httpd.serve_forever()
+	finally:
+		httpd.server_close()
+
+if __name__ == "__main__":
+	import argparse
+	parser = argparse.ArgumentParser(description="Local suggestion service")
+	parser.add_argument("--port", type=int, default=8642)
+	parser.add_argument("--bundle", default=model_bundle.BUNDLE_PATH)
+	parser.add_argument("--corpus", default=model_bundle.CORPUS)
+	parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+	parser.add_argument("--max-wait", type=float, default=MAX_WAIT)
+	parser.add_argument("--cache-size", type=int,
+		default=correction_cache.MAX_SIZE, help="0 disables the cache")
+	parser.add_argument("--cache-policy", default="lru",
+		choices=sorted(correction_cache.POLICIES))
+	parser.add_argument("--instrument", action="store_true",
+		help="record per-stage timings, served at /metrics")
+	args = parser.parse_args()
+	models, version = model_bundle.load_versioned(args.bundle, args.corpus)
+	cache = None
+	if args.cache_size > 0:
+		cache = correction_cache.POLICIES[args.cache_policy](args.cache_size)
+	recorder = instrument.Recorder() if args.instrument else None
+	service = SuggestionService(models, args.max_batch, args.max_wait, cache,
+		version, recorder)
+	print "SERVING ON http://127.0.0.1:%d/" % args.port
+	serve(service, args.port)
@@ -0,0 +1,237 @@
+import array, struct
+import ingest, scramble_helpers
+
+# NumPy is optional: with it, unpack_from() views the index in place rather
+# than copying it.
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# Similarity keys are always four characters (a bigram from each end of a
+# word), so each packs into one unsigned 32-bit int.
+KEY = struct.Struct(">I")
+
+# Lengths of the five arrays and of the text, ahead of them in pack()
+PACKED = struct.Struct("<6Q")
+
+# Multiplier for Fibonacci hashing of packed keys into the slot table
+GOLDEN = 2654435761
+
+# @brief Packs a four-character similarity key into an int
+def pack_key(key):
+	return KEY.unpack(key)[0]
+
+# @brief Inverse of pack_key()
+def unpack_key(packed):
+	return KEY.pack(packed)
+
+# @brief a.item for a numpy array, a.__getitem__ for an array.array
+def _item_getter(a):
+	return getattr(a, "item", None) or a.__getitem__
+
+# @brief Open-addressing slot table for a sorted array of packed keys
+# Slot h of the table holds 1 + the position of a key in keys, or 0 if it is
+# empty. A key's first probe is the top bits of its Fibonacci hash, and
+# collisions probe linearly. The table is kept at most half full.
+#
+# @param keys An array of distinct packed keys
+#
+# @return An array('I') whose length is a power of two
+def build_slots(keys):
+	bits = 1
+	while (1 << bits) < 2*len(keys):
+		bits += 1
+	mask = (1 << bits)-1
+	shift = 32-bits
+	slots = array.array("I", [0])*(1 << bits)
+	for k in range(len(keys)):
+		h = ((keys[k]*GOLDEN) & 0xFFFFFFFF) >> shift
+		while slots[h]:
+			h = (h+1) & mask
+		slots[h] = k+1
+	return slots
+
+# @brief A compact, read-only version of scramble_helpers.similarity_model()
+# Words are interned once: they are sorted, concatenated into a single
+# string, and referred to everywhere else by their position in that order
+# (their ID). The index itself is in CSR layout: a sorted array of packed
+# keys, and for the key at position k, the IDs of its words are
+# postings[offsets[k]:offsets[k+1]], in ascending order. Keys are found
+# through a hash table of positions (see build_slots()).
+#
+# Compared to a defaultdict of sets of strings, this stores each word once
+# rather than in up to nine sets, and every key, slot and posting in four
+# bytes, with no per-object overhead.
+class SimilarityIndex(object):
+	def __init__(self, text, word_offsets, keys, offsets, postings, slots=None):
+		self._text = text
+		self._word_offsets = word_offsets
+		self._keys = keys
+		self._offsets = offsets
+		self._postings = postings
+		if slots is None:
+			slots = build_slots(keys)
+		self._slots = slots
+		# Element getters returning plain ints: indexing a numpy array (see
+		# unpack_from()) makes a numpy scalar, which is slow to compare and
+		# hash
+		self._slot_at, self._key_at, self._offset_at, self._word_offset_at = \
+			[_item_getter(a) for a in (slots, keys, offsets, word_offsets)]
+		self._mask = len(slots)-1
+		self._shift = 32-(len(slots).bit_length()-1)
+
+	# @brief Builds the index from a similarity_model() style mapping
+	#
+	# @param model A mapping from similarity key to a collection of words
+	#
+	# @return A SimilarityIndex
+	@classmethod
+	def from_model(cls, model):
+		words = set()
+		for bucket in model.itervalues():
+			words.update(bucket)
+		words = sorted(words)
+		ids = dict((word, i) for i, word in enumerate(words))
+
+		word_offsets = array.array("I", [0])
+		for word in words:
+			word_offsets.append(word_offsets[-1]+len(word))
+
+		keys, offsets, postings = array.array("I"), array.array("I", [0]), \
+			array.array("I")
+		for key in sorted(key for key in model if model[key]):
+			keys.append(pack_key(key))
+			postings.extend(sorted(ids[word] for word in model[key]))
+			offsets.append(len(postings))
+		return cls("".join(words), word_offsets, keys, offsets, postings)
+
+	# @brief Builds the index straight from a one-word-per-line file
+	@classmethod
+	def from_file(cls, filename):
+		return cls.from_model(scramble_helpers.similarity_model(filename))
+
+	def __len__(self):
+		return len(self._word_offsets)-1
+
+	# @brief The word with the given ID
+	def word(self, word_id):
+		at = self._word_offset_at
+		return self._text[at(word_id):at(word_id+1)]
+
+	# @brief Position of a packed key in the keys array, or -1 if absent
+	def find(self, packed):
+		key_at, slot_at, mask = self._key_at, self._slot_at, self._mask
+		h = ((packed*GOLDEN) & 0xFFFFFFFF) >> self._shift
+		k = slot_at(h)
+		while k:
+			if key_at(k-1) == packed:
+				return k-1
+			h = (h+1) & mask
+			k = slot_at(h)
+		return -1
+
+	# @brief The IDs of the words under one similarity key, possibly empty
+	#
+	# @param key A four-character similarity key
+	#
+	# @return A sorted array of word IDs
+	def postings(self, key):
+		k = self.find(pack_key(key)) if len(key) == 4 else -1
+		if k < 0:
+			return array.array("I")
+		return self._postings[self._offsets[k]:self._offsets[k+1]]
+
+	# @brief IDs of the words similar to word; see scramble_helpers.closest_words
+	# The postings of every key of word are merged into one set of IDs; no
+	# copy of the accumulated result is made per key.
+	#
+	# @param word The word to find closest words of
+	#
+	# @return An array of distinct word IDs, in no particular order
+	def closest_ids(self, word):
+		key_at, slot_at, mask, shift = \
+			self._key_at, self._slot_at, self._mask, self._shift
+		offset_at, postings = self._offset_at, self._postings
+		found = set()
+		for key in ingest.similarity_keys(word):
+			# find(), inlined: this runs nine times per query
+			packed = KEY.unpack(key)[0]
+			h = ((packed*GOLDEN) & 0xFFFFFFFF) >> shift
+			k = slot_at(h)
+			while k:
+				if key_at(k-1) == packed:
+					found.update(postings[offset_at(k-1):offset_at(k)].tolist())
+					break
+				h = (h+1) & mask
+				k = slot_at(h)
+		return array.array("I", found)
+
+	# @brief Words similar to word, in the order closest_ids() returns them
+	def closest_words(self, word):
+		return [self.word(word_id) for word_id in self.closest_ids(word)]
+
+	# @brief Yields every key of the index with the words filed under it
+	def buckets(self):
+		for k, packed in enumerate(self._keys):
+			yield (unpack_key(packed), [self.word(word_id) for word_id in
+				self._postings[self._offsets[k]:self._offsets[k+1]]])
+
+	# @brief Bytes held by the index's string and arrays
+	def nbytes(self):
+		return len(self._text) + sum(a.itemsize*len(a) for a in
+			(self._word_offsets, self._keys, self._offsets, self._postings,
+			self._slots))
+
+	# @brief The index as a tuple of strings, e.g. for marshal
+	def dump(self):
+		return (self._text, self._word_offsets.tostring(),
+			self._keys.tostring(), self._offsets.tostring(),
+			self._postings.tostring(), self._slots.tostring())
+
+	# @brief Inverse of dump()
+	@classmethod
+	def load(cls, dumped):
+		text, arrays = dumped[0], []
+		for raw in dumped[1:]:
+			a = array.array("I")
+			a.fromstring(raw)
+			arrays.append(a)
+		return cls(text, *arrays)
+
+	# @brief The index as one string: the PACKED lengths, the five arrays,
+	# then the text. Every array starts at a multiple of four bytes from the
+	# start of the string.
+	def pack(self):
+		arrays = (self._word_offsets, self._keys, self._offsets,
+			self._postings, self._slots)
+		return PACKED.pack(*[len(a) for a in arrays]+[len(self._text)]) + \
+			"".join(a.tostring() for a in arrays) + str(self._text)
+
+	# @brief Inverse of pack(), reading from offset of buf
+	# With numpy, the arrays and the text are views of buf rather than
+	# copies, so an index unpacked from a memory-mapped file is served from
+	# the mapped pages themselves, which every process mapping the file
+	# shares. buf must then stay open as long as the index is used. Without
+	# numpy the index is copied out of buf.
+	#
+	# @param buf A string or mmap
+	# @param offset Where pack()'s output starts in buf
+	@classmethod
+	def unpack_from(cls, buf, offset=0):
+		lengths = PACKED.unpack_from(buf, offset)
+		offset += PACKED.size
+		arrays = []
+		for n in lengths[:5]:
+			if numpy is not None:
+				a = numpy.frombuffer(buf, numpy.uint32, n, offset)
+			else:
+				a = array.array("I")
+				a.fromstring(buf[offset:offset+4*n])
+			arrays.append(a)
+			offset += 4*n
+		if numpy is not None:
+			text = buffer(buf, offset, lengths[5])
+		else:
+			text = buf[offset:offset+lengths[5]]
+		return cls(text, *arrays)
@@ -1,7 +1,19 @@
-import collections
+import collections, math
+import ingest, loaders, symspell
 
 ALPH = "abcdefghijklmnopqrstuvxyzABCDEFGHIJKLMNOPQRSTUVXYZ"
 
+# Longest piece Speller.segment() considers as one word
+MAX_WORD_LENGTH = 20
+
+# Shortest unknown piece Speller.segment() tries to correct; shorter ones
+# are one edit away from too many words to be worth it
+MIN_CORRECTION_LENGTH = 3
+
+# Log-probability charged for replacing a piece with its correction, so an
+# edit is only made where it beats splitting into known words
+CORRECTION_PENALTY = math.log(1e-3)
+
 def file_to_list(textfile):
 	words=[]
 	for word in textfile:
@@ -117,20 +129,161 @@ def max_c(corrections, histogram):
 	return ret_val
 
 
+# @brief Corrects words against one word histogram, built once
+# The methods mirror the module-level functions, but take the word itself,
+# share the histogram, and generate candidates lazily instead of building
+# lists of every edit.
+class Speller(object):
+	# @param histogram Word -> count
+	# @param total Sum of the counts; computed when omitted
+	def __init__(self, histogram, total=None):
+		self.histogram = histogram
+		self.total = total if total is not None else sum(histogram.values())
+		self._index = None
+
+	# @brief Counts the lines of filename, streamed (across worker
+	# processes), the way build_counter() counts them
+	@classmethod
+	def from_file(cls, filename="corpus", processes=1):
+		return cls(ingest.count_file(filename, "lines", processes))
+
+	# @brief Shares the histogram of a word_model() tuple, e.g. the one in a
+	# compiled model bundle
+	@classmethod
+	def from_word_model(cls, word_model_tuple):
+		return cls(word_model_tuple[0], word_model_tuple[1])
+
+	def check_word(self, word):
+		return word in self.histogram
+
+	#doesn't account for compound words
+	def is_two_words(self, word):
+		for i in range(1, len(word)):
+			if word[:i] in self.histogram and word[i:] in self.histogram:
+				return word[:i] + " " + word[i:]
+		return ""
+
+	# see add_list(): every way of dropping one letter
+	def add_list(self, word):
+		for i in range(0, len(word)):
+			yield word[:i] + word[i+1:]
+
+	# see del_list(): every way of inserting one letter
+	def del_list(self, word):
+		for i in range(0, len(word)+1):
+			for letter in ALPH:
+				yield word[:i] + letter + word[i:]
+
+	# see sub_list(): every way of replacing one letter
+	def sub_list(self, word):
+		for i in range(0, len(word)):
+			for letter in ALPH:
+				yield word[:i] + letter + word[i+1:]
+
+	# @brief Yields each known correction of word once, in the order the
+	# edits are generated
+	def candidates(self, word):
+		seen = set()
+		for lists in (self.add_list, self.del_list, self.sub_list):
+			for correction in lists(word):
+				if correction not in seen:
+					seen.add(correction)
+					if correction in self.histogram:
+						yield correction
+
+	def max_c(self, corrections):
+		ret_val = ""
+		best = 0
+		for word in corrections:
+			if ret_val == "" or self.histogram[word] > best:
+				ret_val, best = word, self.histogram[word]
+		return ret_val
+
+	def suggest(self, word):
+		if self.check_word(word):
+			return word
+		two_words = self.is_two_words(word)
+		if two_words != "":
+			return two_words
+		return self.max_c(self.candidates(word))
+
+	# @brief Splits run-on text into its most probable sequence of words
+	# Viterbi over split points: best[i] is the log-probability of the best
+	# segmentation of text[:i], extended from each of the max_length split
+	# points before it, so the cost is linear in the length of text. Each
+	# distinct piece is scored once. Unknown pieces are scored as in Norvig's
+	# segmenter, falling off by a factor of ten per letter.
+	#
+	# @param text The string to split, e.g. "thequickbrownfox"
+	# @param correct Whether to also consider replacing each unknown piece by
+	# its most frequent known word one edit away
+	# @param max_length The longest piece to consider as one word
+	#
+	# @return The list of words, corrected ones included; text as one word
+	# when the histogram is empty, since there are no words to split it into
+	def segment(self, text, correct=False, max_length=MAX_WORD_LENGTH):
+		if not self.total:
+			return [text] if text else []
+		n = len(text)
+		best = [0.0] + [None]*n
+		back = [0]*(n+1)
+		pieces = {}
+		for i in range(1, n+1):
+			for j in range(max(0, i-max_length), i):
+				piece = text[j:i]
+				scored = pieces.get(piece)
+				if scored is None:
+					scored = pieces[piece] = self._score_piece(piece, correct)
+				score = best[j]+scored[1]
+				if best[i] is None or score > best[i]:
+					best[i], back[i] = score, j
+		words = []
+		while n > 0:
+			words.append(pieces[text[back[n]:n]][0])
+			n = back[n]
+		words.reverse()
+		return words
+
+	# @return A (word, log-probability) pair for one piece of segment()
+	def _score_piece(self, piece, correct):
+		total = float(self.total)
+		count = self.histogram.get(piece)
+		if count:
+			return (piece, math.log(count/total))
+		scored = (piece, math.log(10.0/(total*10.0**len(piece))))
+		if correct and len(piece) >= MIN_CORRECTION_LENGTH:
+			corrections = self.delete_index().lookup(piece, 1)
+			if corrections:
+				correction = max(corrections,
+					key=lambda word: (self.histogram[word], word))
+				score = math.log(self.histogram[correction]/total) + \
+					CORRECTION_PENALTY
+				if score > scored[1]:
+					scored = (correction, score)
+		return scored
+
+	# @brief The symmetric-delete index segment() corrects pieces with,
+	# built on first use
+	def delete_index(self):
+		if self._index is None:
+			self._index = symspell.DeleteIndex(
+				(word for word in self.histogram if word), 1)
+		return self._index
+
+_speller = loaders.LazyModel(lambda: Speller.from_file("corpus"))
+
+# @brief The Speller for "corpus", which is only read on the first call
+def default_speller():
+	return _speller.get()
+
+# @brief Corrects word against the histogram of "corpus"
 def suggest(word):
-	f=open("corpus", "r")
-	words=file_to_list(f)
-	histogram = build_counter(words)
-	if check_word(word,histogram):
-		return word
-	partitions = word_part(word)
-	two_words=is_two_words(partitions,histogram)
-	if two_words != "":
-		return two_words
-	corrections = set(add_list(partitions)+del_list(partitions)+ sub_list(partitions))
-	corrections = check_list(corrections,histogram)
-	return max_c(corrections, histogram)
-				
+	return default_speller().suggest(word)
+
+# @brief Splits run-on text into words, see Speller.segment()
+def segment(text, correct=False):
+	return default_speller().segment(text, correct)
+
 
 #print check_char_sub("grandsonn", histogram)
 #partitions = word_part("button")
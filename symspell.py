@@ -0,0 +1,134 @@
+import sys, time
+
+# Largest edit distance an index answers queries for by default; Norvig's
+# corrector never looks further than two edits.
+MAX_DISTANCE = 2
+
+# @brief Every string obtained by deleting up to distance characters of word
+#
+# @param word The string to delete from
+# @param distance Most characters to delete
+#
+# @return A set of strings, including word itself
+def deletes(word, distance):
+	found = set([word])
+	frontier = [word]
+	for d in range(distance):
+		following = []
+		for s in frontier:
+			for i in range(len(s)):
+				deleted = s[:i] + s[i+1:]
+				if deleted not in found:
+					found.add(deleted)
+					following.append(deleted)
+		frontier = following
+	return found
+
+# @brief Damerau-Levenshtein distance between a and b
+# This is the unrestricted distance (Lowrance-Wagner): the fewest deletions,
+# insertions, substitutions and transpositions of adjacent characters that
+# turn a into b, with no restriction on editing a substring twice. It is
+# exactly how many rounds of norvig.edits1() it takes to reach b from a.
+#
+# @param a First string in comparison
+# @param b Second string in comparison
+#
+# @return The distance between a and b
+def damerau_levenshtein(a, b):
+	m, n = len(a), len(b)
+	infinity = m+n
+	# d[i+1][j+1] is the distance between a[:i] and b[:j]; row and column 0
+	# are a border of infinity
+	d = [[infinity]*(n+2) for i in range(m+2)]
+	for i in range(m+1):
+		d[i+1][1] = i
+	for j in range(n+1):
+		d[1][j+1] = j
+	last_row = {}  # character -> last row of a it appeared in
+	for i in range(1, m+1):
+		last_match_column = 0
+		for j in range(1, n+1):
+			k = last_row.get(b[j-1], 0)
+			l = last_match_column
+			if a[i-1] == b[j-1]:
+				cost = 0
+				last_match_column = j
+			else:
+				cost = 1
+			d[i+1][j+1] = min(
+				d[i][j]+cost,    # substitution (or match)
+				d[i+1][j]+1,     # insertion
+				d[i][j+1]+1,     # deletion
+				d[k][l]+(i-k-1)+1+(j-l-1))  # transposition
+		last_row[a[i-1]] = i
+	return d[m+1][n+1]
+
+# @brief Symmetric-delete (SymSpell style) index over a dictionary
+# Every word is filed under each string obtained by deleting up to
+# max_distance of its characters. Two words within Damerau-Levenshtein
+# distance k of each other always share such a string with at most k
+# deletions on each side (a substitution or transposition is one deletion
+# from each word, an insertion one from the longer), so the words within k
+# of a query are all filed under one of the query's own deletes. Candidates
+# found that way are then checked with damerau_levenshtein().
+#
+# A query thus probes about n*n/2 strings for a word of length n, rather than
+# the hundreds of thousands norvig.known_edits2() generates.
+class DeleteIndex(object):
+	# @param words An iterable of dictionary words
+	# @param max_distance The largest distance lookups may ask for
+	def __init__(self, words, max_distance=MAX_DISTANCE):
+		start = time.time()
+		self.max_distance = max_distance
+		# delete -> word, or a list of words when several share it; most
+		# deletes belong to a single word, and a bare string is much smaller
+		# than a list
+		self._index = index = {}
+		for word in words:
+			for deleted in deletes(word, max_distance):
+				filed = index.get(deleted)
+				if filed is None:
+					index[deleted] = word
+				elif isinstance(filed, list):
+					filed.append(word)
+				else:
+					index[deleted] = [filed, word]
+		self.build_seconds = time.time()-start
+
+	# @brief Every dictionary word within distance edits of word
+	#
+	# @param word The (lower case) word to look up
+	# @param distance Largest Damerau-Levenshtein distance to return; at most
+	# max_distance
+	#
+	# @return A set of dictionary words
+	def lookup(self, word, distance):
+		if distance > self.max_distance:
+			raise ValueError("index was built for distances up to %d" %
+				self.max_distance)
+		index = self._index
+		candidates = set()
+		for deleted in deletes(word, distance):
+			filed = index.get(deleted)
+			if filed is None:
+				continue
+			if isinstance(filed, list):
+				candidates.update(filed)
+			else:
+				candidates.add(filed)
+		return set(candidate for candidate in candidates
+			if abs(len(candidate)-len(word)) <= distance and
+			damerau_levenshtein(word, candidate) <= distance)
+
+	# @brief Approximate bytes held by the index
+	def nbytes(self):
+		total = sys.getsizeof(self._index)
+		for deleted, filed in self._index.iteritems():
+			total += sys.getsizeof(deleted)
+			if isinstance(filed, list):
+				total += sys.getsizeof(filed)
+		return total
+
+	def stats(self):
+		return {"deletes": len(self._index), "bytes": self.nbytes(),
+			"build_seconds": self.build_seconds}
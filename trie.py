@@ -0,0 +1,72 @@
+# Marks the end of a word in a trie node; no character can collide with it
+END = None
+
+# @brief Character trie over a lexicon, searchable by edit distance
+# Finds every word within some Levenshtein distance of a query without
+# scanning the lexicon. Walking down the trie extends one shared row of the
+# Levenshtein array per character, so words with a common prefix share the
+# work for it, and a branch is abandoned as soon as every cell of its row is
+# further than the requested distance.
+class LevenshteinTrie(object):
+	# @param words An iterable of words
+	def __init__(self, words):
+		self._root = {}
+		self._size = 0
+		for word in words:
+			node = self._root
+			for letter in word:
+				node = node.setdefault(letter, {})
+			if END not in node:
+				node[END] = word
+				self._size += 1
+
+	# @brief Builds the trie over the words of a spell.word_model() tuple
+	@classmethod
+	def from_word_model(cls, word_model_tuple):
+		return cls(word for word in word_model_tuple[0] if word)
+
+	def __len__(self):
+		return self._size
+
+	def __contains__(self, word):
+		node = self._root
+		for letter in word:
+			node = node.get(letter)
+			if node is None:
+				return False
+		return END in node
+
+	# @brief Every word within distance edits of word
+	#
+	# @param word The word to search around
+	# @param distance Largest Levenshtein distance to return
+	# @param stats Optional dict; receives the number of trie "nodes" visited
+	#
+	# @return A list of (word, distance) pairs, closest first
+	def within(self, word, distance, stats=None):
+		found = []
+		first = range(len(word)+1)
+		if END in self._root and len(word) <= distance:
+			found.append((self._root[END], len(word)))
+		visited = [0]
+		for letter, child in self._root.iteritems():
+			if letter is not END:
+				self._search(child, letter, word, first, distance, found, visited)
+		if stats is not None:
+			stats["nodes"] = visited[0]
+		found.sort(key=lambda pair: (pair[1], pair[0]))
+		return found
+
+	def _search(self, node, letter, word, above, distance, found, visited):
+		visited[0] += 1
+		row = [above[0]+1]
+		for j in range(1, len(word)+1):
+			row.append(min(row[j-1]+1, above[j]+1,
+				above[j-1]+(word[j-1] != letter)))
+		if END in node and row[-1] <= distance:
+			found.append((node[END], row[-1]))
+		if min(row) <= distance:
+			for following, child in node.iteritems():
+				if following is not END:
+					self._search(child, following, word, row, distance, found,
+						visited)